@@ -5,10 +5,34 @@ def create_app(config_class=Config):
     app = Flask(__name__, template_folder="../templates", static_folder="../static")
     app.config.from_object(config_class)
 
+    # JSON responses understand the compact Row results (app.rows)
+    from .rows import RowJSONProvider
+    app.json = RowJSONProvider(app)
+
     # Initialize Database
     from . import db
     db.init_app(app)
 
+    # Request metrics on /metrics; first, so requests shed below are counted too
+    from . import metrics
+    metrics.init_app(app)
+
+    # Per-request SQL tracing
+    from . import tracing
+    tracing.init_app(app)
+
+    # Last known good reads while the database is down or slow
+    from . import stale
+    stale.init_app(app)
+
+    # Load shedding (rate limits are applied per view with @rate_limit)
+    from . import limits
+    limits.init_app(app)
+
+    # Fingerprinted static assets and the asset_url template helper
+    from . import assets
+    assets.init_app(app)
+
     # Register Blueprints
     from .blueprints import auth, main, posts, claims, api
     app.register_blueprint(auth.bp)
@@ -17,4 +41,9 @@ def create_app(config_class=Config):
     app.register_blueprint(claims.bp)
     app.register_blueprint(api.bp)
 
+    # Maintenance commands and background jobs
+    from . import cli, scheduler
+    cli.init_app(app)
+    scheduler.init_app(app)
+
     return app
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import brotli
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+# Directories under static/ that get fingerprinted (uploads are content-addressed already).
+SOURCE_DIRS = ("CSS", "js", "images")
+COMPRESSIBLE = (".css", ".js", ".svg", ".json")
+MANIFEST = "manifest.json"
+ONE_YEAR = 365 * 24 * 3600
+
+# Relative ES module specifiers: `from './api.js'`, `import './x.js'`, `import('./y.js')`.
+_JS_IMPORT = re.compile(r"""(\bfrom\s*|\bimport\s*\(?\s*)(['"])(\.{1,2}/[^'"]+)\2""")
+
+
+def _write(path, data):
+    """Content-addressed names never change content, so an existing file is left alone."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_dir, out_dir):
+    """
+    Copies every file under SOURCE_DIRS to `out_dir` as `name.<hash>.ext`, with
+    .gz and .br next to each text asset, and
+    writes `out_dir/manifest.json` mapping original to fingerprinted names.
+    Relative imports inside JS modules are rewritten to the fingerprinted
+    names first, so a change to api.js also gives app.js a new URL.
+    Returns the manifest.
+    """
+    sources = set()
+    for top in SOURCE_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(static_dir, top)):
+            for name in filenames:
+                sources.add(os.path.relpath(os.path.join(dirpath, name), static_dir).replace(os.sep, "/"))
+
+    manifest = {}
+
+    def build(rel):
+        if rel in manifest:
+            return manifest[rel]
+        manifest[rel] = rel     # an import cycle falls back to the plain name
+        with open(os.path.join(static_dir, *rel.split("/")), "rb") as f:
+            data = f.read()
+        if rel.endswith(".js"):
+            base = posixpath.dirname(rel)
+
+            def fingerprint_import(match):
+                target = posixpath.normpath(posixpath.join(base, match.group(3)))
+                if target not in sources:
+                    return match.group(0)
+                spec = posixpath.relpath(build(target), base)
+                return f"{match.group(1)}{match.group(2)}{spec if spec.startswith('.') else './' + spec}{match.group(2)}"
+
+            data = _JS_IMPORT.sub(fingerprint_import, data.decode("utf-8")).encode("utf-8")
+
+        stem, ext = posixpath.splitext(rel)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        path = os.path.join(out_dir, *hashed.split("/"))
+        _write(path, data)
+        if ext.lower() in COMPRESSIBLE:
+            _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+            _write(path + ".br", brotli.compress(data, quality=11))
+        manifest[rel] = hashed
+        return hashed
+
+    for rel in sorted(sources):
+        build(rel)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, f"{MANIFEST}.tmp-{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(endpoint, **values):
+    """
+    Drop-in for url_for in templates: `asset_url('static', filename='js/app.js')`
+    gives the fingerprinted /assets/ URL when the file is in the manifest and
+    the plain static URL otherwise. Other endpoints go straight to url_for.
+    """
+    if endpoint == "static":
+        hashed = current_app.extensions.get('asset_manifest', {}).get(values.get("filename"))
+        if hashed:
+            values["filename"] = hashed
+            return url_for("assets.asset", **values)
+    return url_for(endpoint, **values)
+
+
+@bp.get("/<path:filename>")
+def asset(filename):
+    """Fingerprinted files never change, so they are cacheable for good; picks a precompressed variant."""
+    out_dir = current_app.config['ASSETS_OUTPUT']
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding = None
+    for name, suffix in (("br", ".br"), ("gzip", ".gz")):
+        variant = safe_join(out_dir, filename + suffix)
+        if request.accept_encodings[name] and variant and os.path.isfile(variant):
+            encoding, filename = name, filename + suffix
+            break
+    response = send_from_directory(out_dir, filename, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_app(app):
+    """
+    Registers /assets and the `asset_url` template global. With
+    ASSETS_BUILD_ON_STARTUP the fingerprinted copies are (re)built here --
+    a few milliseconds, and a no-op for unchanged files; otherwise the
+    manifest from `flask build-assets` is used. Without a manifest, templates
+    simply get plain /static URLs.
+    """
+    app.register_blueprint(bp)
+    app.add_template_global(asset_url)
+    manifest = {}
+    if app.config['ASSETS_ENABLED']:
+        try:
+            if app.config['ASSETS_BUILD_ON_STARTUP']:
+                manifest = build_assets(app.static_folder, app.config['ASSETS_OUTPUT'])
+            else:
+                manifest = load_manifest(app.config['ASSETS_OUTPUT'])
+        except OSError as e:
+            print(f"❌ Asset build failed, serving plain static files: {e}")
+    app.extensions['asset_manifest'] = manifest
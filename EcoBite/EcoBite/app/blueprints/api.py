@@ -1,18 +1,36 @@
-from flask import Blueprint, jsonify, request, session, current_app
+from flask import Blueprint, Response, jsonify, request, session, current_app, url_for
 from datetime import datetime
-import os
 import json
-from app.db import get_cursor, get_db
-from app.utils import require_login, dict_rows
+from app.db import get_cursor, get_db, get_stream_cursor, pool_stats
+from app.utils import require_login, available_count
+from app.rows import rows, without
+from app.pagination import normalize_sort, page_limit, decode_cursor, keyset_clause, order_clause, split_page
+from app.search import boolean_query, MATCH_SQL
+from app.dietary import parse_tags, save_tags, filter_clause
+from app.feed_cache import get_feed, feed_changed
+from app.expiry import available_condition, expired_condition
+from app.counters import post_created, post_status_changed, read_counters
+from app.user_stats import get_user_stats, invalidate_user_stats
+from app.loaders import get_loader
+from app.streaming import stream_format, stream_rows
+from app.changes import changes_since, decode_token
+from app.events import emit, emit_to_claimers, event_stream, get_broker, TooManySubscribers
+from app.claim_decisions import decide_claim, decide_claims, ClaimDecisionError
+from app.quantities import parse_quantity
+from app.images import get_processor, IMAGE_EXTENSIONS
+from app.storage import get_storage, save_upload, UploadRejected
+from app.passwords import get_hash_pool
+from app.limits import rate_limit, limit_stats
+from app.stale import read_through, get_stale_cache
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 @bp.route("/food-posts", methods=["GET", "POST"])
+@rate_limit("posts")
 def api_food_posts():
-    cur = get_cursor()
-    if not cur: return jsonify({"error": "Database error"}), 500
-
     if request.method == "POST":
+        cur = get_cursor()
+        if not cur: return jsonify({"error": "Database error"}), 500
         if "user_id" not in session: return jsonify({"error": "Unauthorized"}), 401
         
         # Handle both JSON and Form Data
@@ -42,20 +60,19 @@ def api_food_posts():
             return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
 
         try:
+            dietary = parse_tags(dietary)
             dietary_json = json.dumps(dietary)
             
             # Handle Image Upload
             image_file = request.files.get("image") or request.files.get("photo")
-            image_url = None
+            image_url = image_key = None
             if image_file and image_file.filename:
                 try:
-                    ext = os.path.splitext(image_file.filename)[1].lower()
-                    if ext in [".jpg", ".jpeg", ".png", ".webp"]:
-                        filename = f"{session['user_id']}_{int(datetime.now().timestamp())}{ext}"
-                        upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                        os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-                        image_file.save(upload_path)
-                        image_url = f"/static/uploads/{filename}"
+                    storage = get_storage()
+                    image_key = save_upload(image_file, storage, IMAGE_EXTENSIONS)
+                    image_url = storage.url(image_key)
+                except UploadRejected as e:
+                    return jsonify({"error": str(e)}), 400
                 except Exception as e:
                     print(f"❌ Image upload error: {e}")
 
@@ -67,22 +84,30 @@ def api_food_posts():
                 }
                 weight = float(quantity) * estimates.get(category, 0.5) if quantity and quantity.replace('.','',1).isdigit() else estimates.get(category, 0.5)
 
+            amount, unit = parse_quantity(quantity)
             conn = get_db()
             cur.execute("""
                 INSERT INTO posts (
-                    user_id, title, description, category, quantity, 
+                    user_id, title, description, category, quantity, quantity_amount, quantity_unit,
                     estimated_weight_kg, dietary_json, location, 
                     pickup_window_start, pickup_window_end, expires_at, status, image_url, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, NOW())
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, NOW())
             """, (
-                session["user_id"], title, desc, category, quantity, 
+                session["user_id"], title, desc, category, quantity, amount, unit,
                 weight, dietary_json, location, pickup_start, pickup_end, expires_at, image_url
             ))
-            conn.commit()
-            
             post_id = cur.lastrowid
+            save_tags(cur, post_id, dietary)
+            post_created(cur)
+            conn.commit()
+            feed_changed(post_id)
+            invalidate_user_stats(session["user_id"])
+            if image_url:
+                # image_thumb_url / image_card_url are filled in once this finishes
+                get_processor().submit(post_id, image_key, image_url)
+
             cur.execute("SELECT * FROM posts WHERE id=?", (post_id,))
-            new_post = dict_rows(cur.fetchall(), cur.description)[0]
+            new_post = rows(cur.fetchall(), cur.description)[0]
             return jsonify(new_post), 201
             
         except Exception as e:
@@ -94,20 +119,57 @@ def api_food_posts():
         status_filter = request.args.get("status", "available")
         search = request.args.get("search", "").strip()
         cat_filter = request.args.get("type", "All Types")
-        diet_filter = request.args.get("dietary", "")
-        sort_order = request.args.get("sort", "newest")
-
-        query = "SELECT p.*, u.email as owner_email FROM posts p JOIN users u ON p.user_id=u.id WHERE 1=1"
+        diet_filter = parse_tags(",".join(request.args.getlist("dietary")))
+        sort_order = request.args.get("sort", "")
+        limit = page_limit(request.args.get("limit"),
+                           current_app.config['FEED_PAGE_SIZE'], current_app.config['FEED_MAX_PAGE_SIZE'])
+        cursor = request.args.get("cursor")
+        # Streaming mode (?stream=1 / NDJSON) returns every matching row instead of a page.
+        fmt = stream_format()
+
+        # Full-text mode uses the FULLTEXT(title, description) index; searches with no
+        # indexable term (or SEARCH_MODE=like) fall back to the old LIKE scan.
+        fts_query = boolean_query(search) if search and current_app.config['SEARCH_MODE'] == "fulltext" else None
+        if fts_query and sort_order not in ("newest", "endingSoon"):
+            sort_order = "relevance"
+        elif sort_order == "relevance":
+            sort_order = "newest"
+        sort_order = normalize_sort(sort_order)
+
+        # Plain "available" listings are served from the in-memory feed view.
+        if status_filter == "available" and not search and not fmt:
+            feed = get_feed()
+            if feed is not None:
+                try:
+                    decoded = decode_cursor(cursor, sort_order) if cursor else None
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                category = None if cat_filter.lower() in ("all types", "all") else cat_filter
+                posts, next_cursor = feed.query(sort_order, category, diet_filter,
+                                                request.args.get("dietary_mode", "all"), decoded, limit)
+                return _page_response(posts, next_cursor)
+
+        columns = "p.*, u.email as owner_email"
+        select_params = []
+        # The score is selected only to build the next page's cursor; streams order
+        # by the expression instead, and neither sends it to the client.
+        if fts_query and not fmt:
+            columns += f", {MATCH_SQL} AS relevance"
+            select_params.append(fts_query)
+        query = f"SELECT {columns} FROM posts p JOIN users u ON p.user_id=u.id WHERE 1=1"
         params = []
 
         if status_filter == "available":
-            query += " AND p.status='active' AND (p.expires_at IS NULL OR p.expires_at > NOW())"
+            query += " AND " + available_condition()
         elif status_filter == "claimed":
             query += " AND p.status='claimed'"
         elif status_filter == "expired":
-            query += " AND (p.status='expired' OR p.expires_at <= NOW())"
+            query += " AND " + expired_condition()
 
-        if search:
+        if fts_query:
+            query += f" AND {MATCH_SQL}"
+            params.append(fts_query)
+        elif search:
             query += " AND (p.title LIKE ? OR p.description LIKE ?)"
             params.extend([f"%{search}%", f"%{search}%"])
 
@@ -116,18 +178,81 @@ def api_food_posts():
             params.append(cat_filter)
 
         if diet_filter:
-            query += " AND p.dietary_json LIKE ?"
-            params.append(f"%{diet_filter}%")
+            clause, diet_params = filter_clause(diet_filter, request.args.get("dietary_mode", "all"))
+            query += clause
+            params.extend(diet_params)
+
+        if fmt:
+            if sort_order == "relevance":
+                query += order_clause(sort_order, key_sql=MATCH_SQL)
+                params.append(fts_query)
+            else:
+                query += order_clause(sort_order)
+            stream_cur = get_stream_cursor()
+            if not stream_cur: return jsonify({"error": "Database error"}), 500
+            stream_cur.execute(query, tuple(select_params + params))
+            return stream_rows(stream_cur, fmt)
+
+        if cursor:
+            try:
+                if sort_order == "relevance":
+                    clause, cursor_params = keyset_clause(sort_order, decode_cursor(cursor, sort_order),
+                                                          key_sql=MATCH_SQL, key_params=[fts_query])
+                else:
+                    clause, cursor_params = keyset_clause(sort_order, decode_cursor(cursor, sort_order))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            query += clause
+            params.extend(cursor_params)
 
-        if sort_order == "endingSoon":
-            query += " ORDER BY p.expires_at ASC"
-        else: # newest
-            query += " ORDER BY p.created_at DESC"
+        query += order_clause(sort_order) + " LIMIT ?"
+        params = tuple(select_params + params + [limit + 1])
 
-        cur.execute(query, tuple(params))
-        posts = dict_rows(cur.fetchall(), cur.description)
-        return jsonify(posts)
+        def load(cur):
+            cur.execute(query, params)
+            page, next_cursor = split_page(rows(cur.fetchall(), cur.description), limit, sort_order)
+            return without(page, "relevance"), next_cursor
+
+        # Served from the last known good page while the database is down or slow.
+        page = read_through(("food_posts", query, params), load)
+        if page is None: return jsonify({"error": "Database error"}), 500
+        return _page_response(*page)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
+def _page_response(posts, next_cursor):
+    """JSON list response, advertising the next page (if any) in headers."""
+    resp = jsonify(posts)
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{url_for("api.api_food_posts", **{**request.args.to_dict(), "cursor": next_cursor})}>; rel="next"'
+    return resp
+
+@bp.post("/food-posts/available/rebuild")
+def api_rebuild_feed():
+    """Forces a full reload of this worker's materialized available feed."""
+    if session.get("role") != "admin": return jsonify({"error": "Forbidden"}), 403
+    if not current_app.config['FEED_CACHE_ENABLED']: return jsonify({"error": "Feed cache disabled"}), 400
+    feed = get_feed(force=True)
+    if feed is None: return jsonify({"error": "Database error"}), 500
+    return jsonify({"success": True, "available": feed.count()})
+
+@bp.get("/food-posts/changes")
+def api_food_post_changes():
+    """
+    Delta sync for feed clients: posts created, modified or no longer
+    available since ?since=<token>. Call without `since` for a starting token.
+    """
+    cur = get_cursor()
+    if not cur: return jsonify({"error": "Database error"}), 500
+    try:
+        since = decode_token(request.args["since"]) if request.args.get("since") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(changes_since(cur, since, current_app.config['CHANGES_MAX_ROWS'],
+                                     current_app.config['CHANGES_OVERLAP_SECONDS']))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -142,19 +267,12 @@ def api_my_posts():
         cur.execute("""
             SELECT * FROM posts WHERE user_id=? ORDER BY created_at DESC
         """, (session["user_id"],))
-        posts = dict_rows(cur.fetchall(), cur.description)
+        posts = rows(cur.fetchall(), cur.description)
 
-        for p in posts:
-            cur.execute("""
-                SELECT 
-                    COUNT(CASE WHEN status='pending' THEN 1 END) as pending,
-                    COUNT(CASE WHEN status='approved' THEN 1 END) as accepted,
-                    COUNT(CASE WHEN status='rejected' THEN 1 END) as rejected
-                FROM claims WHERE post_id=?
-            """, (p['id'],))
-            counts = dict_rows(cur.fetchall(), cur.description)[0]
+        summaries = get_loader("claims_summary").load_many(cur, [p['id'] for p in posts])
+        for p, counts in zip(posts, summaries):
             p['claims_summary'] = counts
-            
+
         return jsonify(posts)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -165,9 +283,9 @@ def api_get_post(id):
     if not cur: return jsonify({"error": "Database error"}), 500
     try:
         cur.execute("SELECT p.*, u.email as owner_email FROM posts p JOIN users u ON p.user_id=u.id WHERE p.id=?", (id,))
-        rows = cur.fetchall()
-        if not rows: return jsonify({"error": "Post not found"}), 404
-        post = dict_rows(rows, cur.description)[0]
+        fetched = cur.fetchall()
+        if not fetched: return jsonify({"error": "Post not found"}), 404
+        post = rows(fetched, cur.description)[0]
 
         if "user_id" in session and session["user_id"] == post["user_id"]:
             cur.execute("""
@@ -175,7 +293,7 @@ def api_get_post(id):
                 FROM claims c JOIN users u ON c.claimer_id=u.id 
                 WHERE c.post_id=?
             """, (id,))
-            post["claims"] = dict_rows(cur.fetchall(), cur.description)
+            post["claims"] = rows(cur.fetchall(), cur.description)
         
         return jsonify(post)
     except Exception as e:
@@ -194,19 +312,26 @@ def api_update_post_status(id):
     if not new_status: return jsonify({"error": "Status required"}), 400
 
     try:
-        cur.execute("SELECT user_id FROM posts WHERE id=?", (id,))
+        cur.execute("SELECT user_id, status, estimated_weight_kg FROM posts WHERE id=? FOR UPDATE", (id,))
         row = cur.fetchone()
         if not row: return jsonify({"error": "Post not found"}), 404
         if row[0] != session["user_id"]: return jsonify({"error": "Forbidden"}), 403
 
         cur.execute("UPDATE posts SET status=? WHERE id=?", (new_status, id))
+        post_status_changed(cur, row[1], new_status, row[2])
+        event = {"post_id": id, "status": new_status}
+        emit(cur, session["user_id"], "post.status", event)
+        emit_to_claimers(cur, id, "post.status", event)
         conn.commit()
+        feed_changed(id)
+        invalidate_user_stats(session["user_id"])
         return jsonify({"success": True, "status": new_status})
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
 
 @bp.post("/food-posts/<int:id>/claims")
+@rate_limit("claims")
 def api_create_claim(id):
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
@@ -229,14 +354,17 @@ def api_create_claim(id):
         if expires_at and expires_at <= datetime.now(): return jsonify({"error": "Post expired"}), 400
         
         cur.execute("""
-            INSERT INTO claims (post_id, claimer_id, message, requested_quantity, status, created_at)
-            VALUES (?, ?, ?, ?, 'pending', NOW())
-        """, (id, session["user_id"], msg, req_qty))
+            INSERT INTO claims (post_id, claimer_id, message, requested_quantity, requested_amount, status, created_at)
+            VALUES (?, ?, ?, ?, ?, 'pending', NOW())
+        """, (id, session["user_id"], msg, req_qty, parse_quantity(req_qty)[0]))
+        claim_id = cur.lastrowid
+        emit(cur, owner_id, "claim.created", {"claim_id": claim_id, "post_id": id,
+                                              "claimer_id": session["user_id"], "requested_quantity": req_qty})
         conn.commit()
+        invalidate_user_stats(session["user_id"], owner_id)
         
-        claim_id = cur.lastrowid
         cur.execute("SELECT * FROM claims WHERE id=?", (claim_id,))
-        new_claim = dict_rows(cur.fetchall(), cur.description)[0]
+        new_claim = rows(cur.fetchall(), cur.description)[0]
         return jsonify(new_claim), 201
 
     except Exception as e:
@@ -250,15 +378,21 @@ def api_my_claims():
     cur = get_cursor()
     if not cur: return jsonify({"error": "Database error"}), 500
     try:
-        cur.execute("""
+        query = """
             SELECT c.*, p.title as post_title, p.location, p.expires_at, u.email as owner_email
             FROM claims c
             JOIN posts p ON c.post_id=p.id
             JOIN users u ON p.user_id=u.id
             WHERE c.claimer_id=?
             ORDER BY c.created_at DESC
-        """, (session["user_id"],))
-        claims = dict_rows(cur.fetchall(), cur.description)
+        """
+        fmt = stream_format()
+        if fmt:
+            stream_cur = get_stream_cursor()
+            stream_cur.execute(query, (session["user_id"],))
+            return stream_rows(stream_cur, fmt)
+        cur.execute(query, (session["user_id"],))
+        claims = rows(cur.fetchall(), cur.description)
         return jsonify(claims)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -270,20 +404,27 @@ def api_incoming_claims():
     cur = get_cursor()
     if not cur: return jsonify({"error": "Database error"}), 500
     try:
-        cur.execute("""
+        query = """
             SELECT c.*, p.title as post_title, u.email as claimer_email, u.id as claimer_id
             FROM claims c
             JOIN posts p ON c.post_id=p.id
             JOIN users u ON c.claimer_id=u.id
             WHERE p.user_id=?
             ORDER BY c.created_at DESC
-        """, (session["user_id"],))
-        claims = dict_rows(cur.fetchall(), cur.description)
+        """
+        fmt = stream_format()
+        if fmt:
+            stream_cur = get_stream_cursor()
+            stream_cur.execute(query, (session["user_id"],))
+            return stream_rows(stream_cur, fmt)
+        cur.execute(query, (session["user_id"],))
+        claims = rows(cur.fetchall(), cur.description)
         return jsonify(claims)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp.patch("/claims/<int:id>")
+@rate_limit("claims")
 def api_update_claim(id):
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
@@ -296,41 +437,75 @@ def api_update_claim(id):
     if action not in ["accepted", "rejected"]: return jsonify({"error": "Invalid status"}), 400
 
     try:
-        cur.execute("""
-            SELECT c.post_id, p.user_id, c.requested_quantity, p.quantity
-            FROM claims c JOIN posts p ON c.post_id=p.id
-            WHERE c.id=?
-        """, (id,))
-        row = cur.fetchone()
-        if not row: return jsonify({"error": "Claim not found"}), 404
-        post_id, owner_id, req_qty, post_qty = row
-        
-        if owner_id != session["user_id"]: return jsonify({"error": "Forbidden"}), 403
+        decision = decide_claim(cur, id, session["user_id"], approve=(action == "accepted"))
+        conn.commit()
+        if decision.status == "approved":
+            feed_changed(decision.post_id)
+        invalidate_user_stats(decision.owner_id, decision.claimer_id)
+        return jsonify({"success": True, "status": decision.status,
+                        "post_status": decision.post_status, "remaining": decision.remaining})
+    except ClaimDecisionError as e:
+        conn.rollback()
+        return jsonify({"error": e.message, **e.details}), e.status
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
 
-        new_status = "approved" if action == "accepted" else "rejected"
-        
-        cur.execute("UPDATE claims SET status=?, decided_at=NOW() WHERE id=?", (new_status, id))
-        
-        if new_status == "approved":
-            try:
-                p_q = float(str(post_qty).split()[0]) 
-                r_q = float(str(req_qty).split()[0])
-                rem_q = max(0, p_q - r_q)
-                
-                if rem_q <= 0:
-                    cur.execute("UPDATE posts SET status='claimed', quantity='0' WHERE id=?", (post_id,))
-                else:
-                    cur.execute("UPDATE posts SET quantity=? WHERE id=?", (str(rem_q), post_id))
-            except:
-                pass
+@bp.post("/claims/decisions")
+@rate_limit("claims")
+def api_decide_claims():
+    """
+    Body: {"decisions": [{"id": 12, "status": "accepted"}, {"id": 13, "status": "rejected"}, ...]}
+    All decisions are applied in one transaction; each one that fails (not
+    yours, already decided, post ran out) is reported without undoing the rest.
+    """
+    need = require_login()
+    if need: return jsonify({"error": "Unauthorized"}), 401
+    conn = get_db()
+    cur = get_cursor()
+    if not cur: return jsonify({"error": "Database error"}), 500
+
+    data = request.get_json(silent=True) or {}
+    items = data.get("decisions")
+    if not isinstance(items, list) or not items: return jsonify({"error": "decisions must be a non-empty list"}), 400
+    if len(items) > current_app.config['CLAIM_BATCH_MAX']:
+        return jsonify({"error": f"At most {current_app.config['CLAIM_BATCH_MAX']} decisions per request"}), 400
+    decisions = []
+    for item in items:
+        if not isinstance(item, dict) or item.get("status") not in ["accepted", "rejected"]:
+            return jsonify({"error": "Each decision needs an id and a status of accepted or rejected"}), 400
+        try:
+            decisions.append((int(item.get("id")), item["status"] == "accepted"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid claim id"}), 400
 
+    try:
+        outcomes = decide_claims(cur, session["user_id"], decisions)
         conn.commit()
-        return jsonify({"success": True, "status": new_status})
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
 
+    results, users, approved_posts = [], {session["user_id"]}, set()
+    for claim_id, outcome in outcomes:
+        if isinstance(outcome, ClaimDecisionError):
+            results.append({"id": claim_id, "success": False, "error": outcome.message,
+                            "code": outcome.status, **outcome.details})
+            continue
+        users.add(outcome.claimer_id)
+        if outcome.status == "approved":
+            approved_posts.add(outcome.post_id)
+        results.append({"id": claim_id, "success": True, "status": outcome.status,
+                        "post_id": outcome.post_id, "post_status": outcome.post_status,
+                        "remaining": outcome.remaining})
+    if approved_posts:
+        feed_changed(*approved_posts)
+    invalidate_user_stats(*users)
+    succeeded = sum(r["success"] for r in results)
+    return jsonify({"results": results, "succeeded": succeeded, "failed": len(results) - succeeded})
+
 @bp.patch("/claims/<int:id>/cancel")
+@rate_limit("claims")
 def api_cancel_claim(id):
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
@@ -339,33 +514,56 @@ def api_cancel_claim(id):
     if not cur: return jsonify({"error": "Database error"}), 500
 
     try:
-        cur.execute("SELECT claimer_id FROM claims WHERE id=?", (id,))
+        cur.execute("SELECT c.claimer_id, c.post_id, p.user_id FROM claims c JOIN posts p ON c.post_id=p.id WHERE c.id=?", (id,))
         row = cur.fetchone()
         if not row: return jsonify({"error": "Claim not found"}), 404
         if row[0] != session["user_id"]: return jsonify({"error": "Forbidden"}), 403
 
         cur.execute("UPDATE claims SET status='cancelled' WHERE id=?", (id,))
+        emit(cur, row[2], "claim.cancelled", {"claim_id": id, "post_id": row[1]})
         conn.commit()
+        feed_changed(row[1])
+        invalidate_user_stats(row[0], row[2])
         return jsonify({"success": True})
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
 
+@bp.get("/events")
+def api_events():
+    """
+    Server-sent events for the current user: claim.created, claim.decided,
+    claim.cancelled and post.status. Reconnects resume after Last-Event-ID.
+    An idle stream holds no database connection.
+    """
+    need = require_login()
+    if need: return jsonify({"error": "Unauthorized"}), 401
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.args.get("lastEventId") or 0)
+    except ValueError:
+        last_id = 0
+    try:
+        stream = event_stream(get_broker(), session["user_id"], last_id, current_app.config['EVENTS_HEARTBEAT'])
+    except TooManySubscribers as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return Response(stream, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @bp.get("/stats/global")
 def api_stats_global():
-    cur = get_cursor()
-    if not cur: return jsonify({"error": "Database error"}), 500
+    def load(cur):
+        counters = read_counters(cur)
+        return {
+            "available_now": available_count(),
+            "successfully_shared": int(counters["shared_posts"]),
+            "total_posts": int(counters["total_posts"]),
+            "food_waste_prevented_kg": float(counters["shared_weight_kg"]),
+        }
     try:
-        stats = {}
-        cur.execute("SELECT COUNT(*) FROM posts WHERE status='active' AND (expires_at IS NULL OR expires_at > NOW())")
-        stats["available_now"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM posts WHERE status IN ('claimed', 'completed')")
-        stats["successfully_shared"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM posts")
-        stats["total_posts"] = cur.fetchone()[0]
-        cur.execute("SELECT SUM(estimated_weight_kg) FROM posts WHERE status IN ('claimed', 'completed')")
-        weight = cur.fetchone()[0]
-        stats["food_waste_prevented_kg"] = float(weight) if weight else 0.0
+        stats = read_through("global_stats", load)
+        if stats is None: return jsonify({"error": "Database error"}), 500
         return jsonify(stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -379,23 +577,34 @@ def api_stats_me():
     
     uid = session["user_id"]
     try:
-        stats = {}
-        cur.execute("SELECT COUNT(*) FROM posts WHERE user_id=?", (uid,))
-        stats["posts_created"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM posts WHERE user_id=? AND status IN ('claimed', 'completed')", (uid,))
-        stats["posts_shared"] = cur.fetchone()[0]
-        cur.execute("SELECT SUM(estimated_weight_kg) FROM posts WHERE user_id=? AND status IN ('claimed', 'completed')", (uid,))
-        weight = cur.fetchone()[0]
-        stats["weight_shared_kg"] = float(weight) if weight else 0.0
-        cur.execute("SELECT COUNT(*) FROM claims WHERE claimer_id=?", (uid,))
-        stats["claims_made"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM claims WHERE claimer_id=? AND status='approved'", (uid,))
-        stats["claims_accepted"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM claims WHERE claimer_id=? AND status='rejected'", (uid,))
-        stats["claims_rejected"] = cur.fetchone()[0]
-        cur.execute("SELECT created_at FROM users WHERE id=?", (uid,))
-        row = cur.fetchone()
-        stats["join_date"] = row[0] if row else None
-        return jsonify(stats)
+        snapshot = get_user_stats(uid)
+        if snapshot is None: return jsonify({"error": "Database error"}), 500
+        keys = ("posts_created", "posts_shared", "weight_shared_kg", "claims_made",
+                "claims_accepted", "claims_rejected", "join_date")
+        return jsonify({k: snapshot[k] for k in keys})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@bp.get("/stats/pool")
+def api_stats_pool():
+    """Connection pool counters for this worker process."""
+    if session.get("role") != "admin": return jsonify({"error": "Forbidden"}), 403
+    return jsonify(pool_stats())
+
+@bp.get("/stats/passwords")
+def api_stats_passwords():
+    """Password hashing queue depth and counters for this worker process."""
+    if session.get("role") != "admin": return jsonify({"error": "Forbidden"}), 403
+    return jsonify(get_hash_pool().stats())
+
+@bp.get("/stats/limits")
+def api_stats_limits():
+    """Admission control and rate limiting counters for this worker process."""
+    if session.get("role") != "admin": return jsonify({"error": "Forbidden"}), 403
+    return jsonify(limit_stats())
+
+@bp.get("/stats/stale")
+def api_stats_stale():
+    """Last known good cache counters and DB latency estimate for this worker process."""
+    if session.get("role") != "admin": return jsonify({"error": "Forbidden"}), 403
+    return jsonify(get_stale_cache().stats())
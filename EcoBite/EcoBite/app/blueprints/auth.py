@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 import mariadb
 from app.db import get_cursor, get_db
+from app.passwords import hash_password, verify_password, PasswordBusy
+from app.limits import rate_limit
 
 bp = Blueprint('auth', __name__)
 
@@ -15,6 +16,7 @@ def get_started():
     return render_template("get_started.html")
 
 @bp.route("/login", methods=["GET", "POST"])
+@rate_limit("login")
 def login(): 
     if "user_id" in session:
         return redirect(url_for("main.home"))
@@ -22,18 +24,29 @@ def login():
     if request.method == "POST":
         email = request.form.get("email","").strip().lower()
         password = request.form.get("password","")
+        conn = get_db()
         cur = get_cursor()
         if cur is None:
             return redirect(url_for("auth.login"))
         try:
             cur.execute("SELECT id,email,password_hash,role FROM users WHERE email=?", (email,))
             row = cur.fetchone()
-            if not row or not check_password_hash(row[2], password):
+            ok, new_hash = verify_password(row[2], password) if row else (False, None)
+            if not ok:
                 flash("Invalid email or password.","error")
                 return redirect(url_for("auth.login"))
+            if new_hash:
+                # Legacy werkzeug hash or old argon2 costs: upgrade now that we know the password.
+                # Conditional, so a password changed meanwhile is not overwritten.
+                cur.execute("UPDATE users SET password_hash=? WHERE id=? AND password_hash=?",
+                            (new_hash, row[0], row[2]))
+                conn.commit()
             session.update({"user_id": row[0], "email": row[1], "role": row[3]})
             flash("Welcome back!","success")
             return redirect(url_for("main.home"))
+        except PasswordBusy:
+            flash("We're busy signing people in. Please try again in a moment.","error")
+            return redirect(url_for("auth.login"))
         except Exception as e:
             print(f"❌ Login error: {e}")
             flash("An error occurred. Please try again.","error")
@@ -48,6 +61,7 @@ def logout():
     return redirect(url_for("main.landing"))
 
 @bp.route("/signup", methods=["GET", "POST"])
+@rate_limit("signup")
 def signup(): 
     if "user_id" in session:
         return redirect(url_for("main.home"))
@@ -62,7 +76,6 @@ def signup():
             flash("Email and password are required.","error")
             return redirect(url_for("auth.signup"))
         
-        pw_hash = generate_password_hash(password)
         conn = get_db()
         cur = get_cursor()
         if cur is None:
@@ -75,6 +88,7 @@ def signup():
                 flash("Email already exists. Please use a different email or login instead.","error")
                 return redirect(url_for("auth.signup"))
             
+            pw_hash = hash_password(password)
             cur.execute("INSERT INTO users (email,password_hash,role) VALUES (?,?,?)", (email,pw_hash,role))
             conn.commit()
             
@@ -92,6 +106,9 @@ def signup():
                 flash("An error occurred during registration. Please try again.","error")
                 print(f"❌ Signup IntegrityError: {e}")
             return redirect(url_for("auth.signup"))
+        except PasswordBusy:
+            flash("We're busy signing people up. Please try again in a moment.","error")
+            return redirect(url_for("auth.signup"))
         except Exception as e:
             conn.rollback()
             print(f"❌ Signup error: {e}")
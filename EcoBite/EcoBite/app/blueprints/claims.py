@@ -1,11 +1,18 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from app.db import get_cursor, get_db
-from app.utils import require_login, dict_rows
+from app.utils import require_login
+from app.rows import rows
+from app.feed_cache import feed_changed
+from app.user_stats import invalidate_user_stats
+from app.events import emit
+from app.claim_decisions import decide_claim, ClaimDecisionError
+from app.limits import rate_limit
 import mariadb
 
 bp = Blueprint('claims', __name__)
 
 @bp.post("/claim/<int:post_id>")
+@rate_limit("claims")
 def claim_post(post_id):
     need = require_login()
     if need: return need
@@ -26,7 +33,10 @@ def claim_post(post_id):
             INSERT INTO claims (post_id, claimer_id, message)
             VALUES (?, ?, ?)
         """,(post_id, session["user_id"], message or None))
+        emit(cur, row[0], "claim.created", {"claim_id": cur.lastrowid, "post_id": post_id,
+                                            "claimer_id": session["user_id"]})
         conn.commit()
+        invalidate_user_stats(session["user_id"], row[0])
         flash("Request sent to owner!","success")
     except mariadb.IntegrityError:
         conn.rollback()
@@ -38,6 +48,7 @@ def claim_post(post_id):
     return redirect(url_for("main.home"))
 
 @bp.post("/claim/<int:claim_id>/<action>")
+@rate_limit("claims")
 def update_claim_status(claim_id, action):
     need = require_login()
     if need: return need
@@ -48,26 +59,15 @@ def update_claim_status(claim_id, action):
         flash("Database connection error. Please try again.","error")
         return redirect(url_for("posts.myposts"))
     try:
-        cur.execute("""
-            SELECT c.post_id,p.user_id
-            FROM claims c JOIN posts p ON c.post_id=p.id
-            WHERE c.id=?
-        """,(claim_id,))
-        claim = cur.fetchone()
-        if not claim: flash("Claim not found.","error"); return redirect(url_for("posts.myposts"))
-        post_id, owner_id = claim
-        if owner_id != session["user_id"]:
-            flash("You are not authorized.","error")
-            return redirect(url_for("posts.myposts"))
-        new_status = "approved" if action=="approve" else "rejected"
-        cur.execute("""
-            UPDATE claims SET status=?, decided_at=NOW() WHERE id=?
-        """,(new_status,claim_id))
-        
-        if new_status=="approved":
-            cur.execute("UPDATE posts SET status='claimed' WHERE id=?", (post_id,))
+        decision = decide_claim(cur, claim_id, session["user_id"], approve=(action=="approve"))
         conn.commit()
-        flash(f"Claim {new_status}.","success")
+        if decision.status=="approved":
+            feed_changed(decision.post_id)
+        invalidate_user_stats(decision.owner_id, decision.claimer_id)
+        flash(f"Claim {decision.status}.","success")
+    except ClaimDecisionError as e:
+        conn.rollback()
+        flash("You are not authorized." if e.status == 403 else f"{e.message}.","error")
     except Exception as e:
         conn.rollback()
         print("❌ Approve/Reject error:", e)
@@ -93,7 +93,7 @@ def requests_page():
             WHERE c.claimer_id = ?
             ORDER BY c.created_at DESC
         """,(session["user_id"],))
-        claims = dict_rows(cur.fetchall(), cur.description)
+        claims = rows(cur.fetchall(), cur.description)
     except Exception as e:
         print("❌ Requests error:", e); claims=[]
     return render_template("requests.html", claims=claims)
@@ -1,6 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash
-from app.db import get_cursor
-from app.utils import require_login, compute_stats, dict_rows
+from flask import Blueprint, render_template, redirect, url_for, session, flash, current_app
+from app.utils import require_login, compute_stats
+from app.rows import rows
+from app.pagination import order_clause, split_page
+from app.feed_cache import get_feed
+from app.expiry import available_condition
+from app.stale import read_through
 
 bp = Blueprint('main', __name__)
 
@@ -14,23 +18,27 @@ def landing():
 @bp.route("/home")
 def home():
     if "user_id" not in session: return redirect(url_for("auth.login"))
-    cur = get_cursor()
     posts = []
-    if cur:
-        try:
+    next_cursor = None
+    feed = get_feed()
+    limit = current_app.config['FEED_PAGE_SIZE']
+    if feed is not None:
+        posts, next_cursor = feed.query(limit=limit)
+    else:
+        def load(cur):
             cur.execute("""
                 SELECT p.id,p.description,p.category,p.quantity,p.status,p.location,
-                       p.expires_at,u.email AS owner_email
+                       p.expires_at,p.created_at,u.email AS owner_email
                 FROM posts p
                 JOIN users u ON p.user_id=u.id
-                WHERE p.status='active' AND (p.expires_at IS NULL OR p.expires_at > NOW())
-                ORDER BY p.created_at DESC
-            """)
-            posts = dict_rows(cur.fetchall(), cur.description)
+                WHERE """ + available_condition() + order_clause("newest") + " LIMIT ?", (limit + 1,))
+            return split_page(rows(cur.fetchall(), cur.description), limit, "newest")
+        try:
+            posts, next_cursor = read_through(("home_feed", limit), load) or ([], None)
         except Exception as e:
             print("❌ Feed error:", e); posts=[]
     stats = compute_stats()
-    return render_template("index.html", posts=posts, stats=stats, email=session.get("email"))
+    return render_template("index.html", posts=posts, next_cursor=next_cursor, stats=stats, email=session.get("email"))
 
 @bp.route("/profile")
 def profile():
@@ -2,11 +2,19 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from datetime import datetime, timedelta
 import json
 from app.db import get_cursor, get_db
-from app.utils import require_login, compute_stats, dict_rows
+from app.utils import require_login, compute_stats
+from app.rows import rows
+from app.dietary import parse_tags, save_tags
+from app.feed_cache import feed_changed
+from app.counters import post_created
+from app.quantities import parse_quantity
+from app.limits import rate_limit
+from app.user_stats import invalidate_user_stats
 
 bp = Blueprint('posts', __name__)
 
 @bp.route("/create", methods=["GET","POST"])
+@rate_limit("posts")
 def create():
     need = require_login(); 
     if need: return need
@@ -16,7 +24,7 @@ def create():
         qty = request.form.get("qty","")
         expiry_str = request.form.get("expiry_time","")
         location = request.form.get("location","").strip()
-        diets = request.form.getlist("diet")
+        diets = parse_tags(request.form.getlist("diet"))
         dietary_json = json.dumps(diets) if diets else None
         
         if not desc or not expiry_str or not location:
@@ -38,11 +46,17 @@ def create():
             if cur is None:
                 flash("Database connection error. Please try again.","error")
                 return redirect(url_for("posts.create"))
+            amount, unit = parse_quantity(qty)
             cur.execute("""
-                INSERT INTO posts (user_id,description,category,quantity,dietary_json,location,expiry_minutes,expires_at,status)
-                VALUES (?,?,?,?,?,?,?,?,'active')
-            """, (session["user_id"],desc,category,qty or None,dietary_json,location,expiry_minutes,expiry_dt))
+                INSERT INTO posts (user_id,description,category,quantity,quantity_amount,quantity_unit,dietary_json,location,expiry_minutes,expires_at,status)
+                VALUES (?,?,?,?,?,?,?,?,?,?,'active')
+            """, (session["user_id"],desc,category,qty or None,amount,unit,dietary_json,location,expiry_minutes,expiry_dt))
+            post_id = cur.lastrowid
+            save_tags(cur, post_id, diets)
+            post_created(cur)
             conn.commit()
+            feed_changed(post_id)
+            invalidate_user_stats(session["user_id"])
             flash("Post shared successfully!","success")
             return redirect(url_for("main.home"))
         except ValueError as e:
@@ -70,7 +84,7 @@ def myposts():
             SELECT id,description,category,quantity,status,created_at
             FROM posts WHERE user_id=? ORDER BY created_at DESC
         """,(session["user_id"],))
-        posts = dict_rows(cur.fetchall(), cur.description)
+        posts = rows(cur.fetchall(), cur.description)
     except Exception as e:
         print("❌ MyPosts error:", e); posts=[]
     stats = compute_stats(session["user_id"])
@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from app.expiry import available_condition
+from app.rows import rows
+
+# Posts changed after a point in time, in (updated_at, id) order. `available`
+# tells the client whether to upsert the post or drop it from its feed.
+CHANGES_SQL = """
+    SELECT p.*, u.email as owner_email, ({available}) AS available
+    FROM posts p JOIN users u ON p.user_id=u.id
+    WHERE {after}
+    ORDER BY p.updated_at, p.id
+    LIMIT ?
+"""
+
+
+def encode_token(updated_at, last_id=0, caught_up=True):
+    """
+    Opaque sync token. A caught-up token means "everything up to updated_at
+    was sent"; otherwise the previous response was truncated and the next one
+    continues strictly after (updated_at, last_id).
+    """
+    payload = {"t": updated_at.isoformat(), "id": last_id, "c": int(caught_up)}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_token(token):
+    """Returns (updated_at, last_id, caught_up), or raises ValueError."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["id"]), bool(data["c"])
+    except Exception:
+        raise ValueError("Invalid sync token")
+
+
+def changes_since(cur, since, limit=500, overlap=5):
+    """
+    Posts created, modified or made unavailable since `since` (a decoded
+    token, or None to just obtain a starting token).
+
+    Writers commit out of updated_at order, so a caught-up token re-reads the
+    last `overlap` seconds: a row stamped just before the previous poll but
+    committed just after it is still picked up. Clients apply changes as
+    idempotent upserts/removals, so the repeats are harmless.
+    """
+    if since is None:
+        cur.execute("SELECT NOW(6)")
+        return {"changed": [], "removed": [], "more": False,
+                "token": encode_token(cur.fetchone()[0])}
+
+    updated_at, last_id, caught_up = since
+    if caught_up:
+        after, params = "p.updated_at > ?", [updated_at - timedelta(seconds=overlap)]
+    else:
+        after = "(p.updated_at > ? OR (p.updated_at = ? AND p.id > ?))"
+        params = [updated_at, updated_at, last_id]
+
+    cur.execute(CHANGES_SQL.format(available=available_condition(), after=after), (*params, limit + 1))
+    found = rows(cur.fetchall(), cur.description)
+    more = len(found) > limit
+    found = found[:limit]
+
+    changed, removed = [], []
+    for row in found:
+        if row["available"]:
+            changed.append(row)
+        else:
+            removed.append(row["id"])
+    if more:
+        token = encode_token(found[-1]["updated_at"], found[-1]["id"], caught_up=False)
+    else:
+        newest = max([updated_at] + [row["updated_at"] for row in found])
+        token = encode_token(newest)
+    return {"changed": changed, "removed": removed, "more": more, "token": token}
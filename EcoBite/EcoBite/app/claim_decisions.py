@@ -0,0 +1,123 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from app.counters import post_status_changed
+from app.events import emit, emit_to_claimers
+from app.quantities import format_quantity
+
+Decision = namedtuple("Decision", "claim_id post_id owner_id claimer_id status post_status remaining")
+
+
+class ClaimDecisionError(Exception):
+    """A claim could not be decided; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+# Approval in one statement: take the requested amount if enough is left and
+# flip the post to 'claimed' once nothing remains. SET is evaluated left to
+# right, so `status` still sees the old amount and `quantity` the new one.
+# Posts without a numeric amount are taken whole by the first approval.
+APPROVE_SQL = """
+    UPDATE posts SET
+        status = IF(quantity_amount IS NULL OR quantity_amount <= ?, 'claimed', status),
+        quantity_amount = quantity_amount - ?,
+        quantity = IF(quantity_amount IS NULL, quantity,
+                      CONCAT_WS(' ', TRIM(TRAILING '.' FROM TRIM(TRAILING '0' FROM quantity_amount)),
+                                quantity_unit))
+    WHERE id = ? AND status = 'active' AND (quantity_amount IS NULL OR quantity_amount >= ?)
+"""
+
+
+def load_claims(cur, claim_ids):
+    """{claim_id: (post_id, owner_id, claimer_id, requested_amount, post_weight)} in one query."""
+    if not claim_ids:
+        return {}
+    placeholders = ",".join("?" * len(claim_ids))
+    cur.execute(f"""
+        SELECT c.id, c.post_id, p.user_id, c.claimer_id, c.requested_amount, p.estimated_weight_kg
+        FROM claims c JOIN posts p ON c.post_id=p.id
+        WHERE c.id IN ({placeholders})
+    """, tuple(claim_ids))
+    return {row[0]: row[1:] for row in cur.fetchall()}
+
+
+def decide_claim(cur, claim_id, user_id, approve, claim=None):
+    """
+    Approves or rejects one pending claim on a post owned by `user_id`, in the
+    caller's transaction. Every check is part of a conditional UPDATE, so no
+    row is locked before the statement that changes it and concurrent
+    approvals can neither over-allocate nor lose a decrement.
+
+    Raises ClaimDecisionError; the caller must then roll back (or roll back
+    to a savepoint), since the claim row may already have been updated.
+    `claim` is this claim's load_claims() entry, when already fetched.
+    """
+    if claim is None:
+        claim = load_claims(cur, [claim_id]).get(claim_id)
+    if claim is None:
+        raise ClaimDecisionError("Claim not found", 404)
+    post_id, owner_id, claimer_id, requested, weight = claim
+    if owner_id != user_id:
+        raise ClaimDecisionError("Forbidden", 403)
+
+    new_status = "approved" if approve else "rejected"
+    cur.execute("UPDATE claims SET status=?, decided_at=NOW() WHERE id=? AND status='pending'",
+                (new_status, claim_id))
+    if cur.rowcount == 0:
+        raise ClaimDecisionError("Claim already decided", 409)
+
+    post_status, remaining = None, None
+    if approve:
+        amount = requested if requested is not None else Decimal(1)
+        cur.execute(APPROVE_SQL, (amount, amount, post_id, amount))
+        updated = cur.rowcount
+        # Our own update is visible to a plain read; after a refusal, a locking
+        # read reports the current amount rather than this transaction's snapshot.
+        cur.execute("SELECT status, quantity_amount, quantity_unit FROM posts WHERE id=?"
+                    + ("" if updated else " LOCK IN SHARE MODE"), (post_id,))
+        post_status, remaining, unit = cur.fetchone()
+        if not updated:
+            if post_status != "active":
+                raise ClaimDecisionError("Post no longer available", 409, post_status=post_status)
+            raise ClaimDecisionError(
+                f"Only {format_quantity(remaining, unit)} left, {format_quantity(amount, unit)} requested",
+                409, remaining=remaining, requested=amount)
+        if post_status == "claimed":
+            post_status_changed(cur, "active", "claimed", weight)
+            emit_to_claimers(cur, post_id, "post.status", {"post_id": post_id, "status": "claimed"})
+
+    emit(cur, claimer_id, "claim.decided", {"claim_id": claim_id, "post_id": post_id, "status": new_status})
+    return Decision(claim_id, post_id, owner_id, claimer_id, new_status, post_status, remaining)
+
+
+def decide_claims(cur, user_id, decisions):
+    """
+    Applies [(claim_id, approve), ...] in the caller's transaction, loading
+    every claim (and so checking ownership) in one query. Each decision runs
+    under a savepoint, so a failure -- typically the post running out part
+    way through the batch -- undoes only that claim. Returns
+    [(claim_id, Decision or ClaimDecisionError)] in input order.
+    """
+    claims = load_claims(cur, list({claim_id for claim_id, _ in decisions}))
+    results, seen = [], set()
+    for claim_id, approve in decisions:
+        if claim_id in seen:
+            results.append((claim_id, ClaimDecisionError("Duplicate claim in batch", 400)))
+            continue
+        seen.add(claim_id)
+        if claim_id not in claims:
+            results.append((claim_id, ClaimDecisionError("Claim not found", 404)))
+            continue
+        # Re-using the name replaces the previous savepoint; COMMIT drops the last one.
+        cur.execute("SAVEPOINT claim_decision")
+        try:
+            results.append((claim_id, decide_claim(cur, claim_id, user_id, approve, claim=claims[claim_id])))
+        except ClaimDecisionError as e:
+            cur.execute("ROLLBACK TO SAVEPOINT claim_decision")
+            results.append((claim_id, e))
+    return results
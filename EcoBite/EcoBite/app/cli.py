@@ -0,0 +1,115 @@
+import click
+from flask.cli import with_appcontext
+
+from app.db import get_db
+
+
+@click.command("reconcile-stats")
+@with_appcontext
+def reconcile_stats_command():
+    """Recompute the stats counters from scratch and report drift."""
+    from app.counters import reconcile
+
+    conn = get_db()
+    if conn is None:
+        raise click.ClickException("Database unavailable")
+    drift = reconcile(conn)
+    click.echo(f"Drift corrected: {drift}" if drift else "Counters are in sync.")
+
+
+@click.command("sweep-expired")
+@click.option("--batch-size", default=500, show_default=True)
+@with_appcontext
+def sweep_expired_command(batch_size):
+    """Expire overdue posts now and reject their pending claims."""
+    from app.expiry import sweep_expired, SweepRunning
+
+    conn = get_db()
+    if conn is None:
+        raise click.ClickException("Database unavailable")
+    try:
+        expired, rejected, _ = sweep_expired(conn, batch_size, max_batches=10**6)
+    except SweepRunning as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Expired {expired} posts, rejected {rejected} pending claims.")
+
+
+@click.command("process-images")
+@click.option("--limit", default=1000, show_default=True, help="posts to process in this run")
+@with_appcontext
+def process_images_command(limit):
+    """Build missing thumbnails/WebP versions for posts uploaded before the pipeline."""
+    from app.images import process_post_image
+    from app.storage import get_storage
+
+    conn = get_db()
+    if conn is None:
+        raise click.ClickException("Database unavailable")
+    cur = conn.cursor()
+    cur.execute("SELECT id, image_url FROM posts WHERE image_url IS NOT NULL AND image_thumb_url IS NULL "
+                "ORDER BY id LIMIT ?", (limit,))
+    pending = cur.fetchall()
+    cur.close()
+    storage = get_storage()
+    done = failed = 0
+    for post_id, image_url in pending:
+        key = storage.key_for_url(image_url)
+        if key is None:
+            failed += 1
+            click.echo(f"Post {post_id}: {image_url} is not in upload storage", err=True)
+            continue
+        try:
+            process_post_image(post_id, key, image_url)
+            done += 1
+        except Exception as e:
+            failed += 1
+            click.echo(f"Post {post_id}: {e}", err=True)
+    click.echo(f"Processed {done} images, {failed} failed.")
+
+
+@click.command("gc-uploads")
+@click.option("--dry-run", is_flag=True, help="only list what would be deleted")
+@click.option("--grace-hours", type=int, default=None,
+              help="keep unreferenced files newer than this (default UPLOAD_GC_GRACE_HOURS)")
+@with_appcontext
+def gc_uploads_command(dry_run, grace_hours):
+    """Delete uploaded files and derivatives that no post references any more."""
+    from flask import current_app
+    from app.storage import get_storage, referenced_keys, collect_garbage
+
+    conn = get_db()
+    if conn is None:
+        raise click.ClickException("Database unavailable")
+    if grace_hours is None:
+        grace_hours = current_app.config['UPLOAD_GC_GRACE_HOURS']
+    storage = get_storage()
+    cur = conn.cursor()
+    referenced = referenced_keys(cur, storage)
+    cur.close()
+    deleted, freed = collect_garbage(storage, referenced, grace_hours * 3600, dry_run=dry_run)
+    for key in deleted:
+        click.echo(key)
+    verb = "Would delete" if dry_run else "Deleted"
+    click.echo(f"{verb} {len(deleted)} files ({freed / 1024 / 1024:.1f} MB); {len(referenced)} referenced.")
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Write fingerprinted, precompressed copies of the static assets and their manifest."""
+    from flask import current_app
+    from app.assets import build_assets
+
+    manifest = build_assets(current_app.static_folder, current_app.config['ASSETS_OUTPUT'])
+    click.echo(f"Built {len(manifest)} assets into {current_app.config['ASSETS_OUTPUT']}")
+
+
+def init_app(app):
+    """
+    Register maintenance commands (`flask --app run <command>`).
+    """
+    app.cli.add_command(reconcile_stats_command)
+    app.cli.add_command(sweep_expired_command)
+    app.cli.add_command(process_images_command)
+    app.cli.add_command(gc_uploads_command)
+    app.cli.add_command(build_assets_command)
@@ -10,7 +10,128 @@ class Config:
     DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
     DB_PORT = int(os.getenv("DB_PORT", "3306"))
     DB_NAME = os.getenv("DB_NAME", "ecobite")
+
+    # Connection pool (per worker process)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))      # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # seconds before a connection is replaced
     
-    # Uploads
+    # Per-client token buckets (app.limits), "count/period" with period second|minute|hour|day.
+    # Keyed by IP and, when signed in, by user; behind a proxy wrap the app in
+    # werkzeug's ProxyFix so the client IP is the real one. "0" disables a budget.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_LOGIN = os.getenv("RATE_LIMIT_LOGIN", "10/minute")
+    RATE_LIMIT_SIGNUP = os.getenv("RATE_LIMIT_SIGNUP", "5/minute")
+    RATE_LIMIT_POSTS = os.getenv("RATE_LIMIT_POSTS", "20/minute")
+    RATE_LIMIT_CLAIMS = os.getenv("RATE_LIMIT_CLAIMS", "60/minute")
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))       # buckets kept per process
+
+    # Admission control: answer 503 + Retry-After instead of queueing once this
+    # process has too much in flight or too many requests waiting for a DB connection (0 = off)
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+    ADMISSION_MAX_DB_WAITING = int(os.getenv("ADMISSION_MAX_DB_WAITING", "10"))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))       # seconds
+    # Never shed: static files, long-lived event streams and the stats/metrics endpoints
+    ADMISSION_EXEMPT = ("static", "assets.asset", "api.api_events", "metrics.metrics", "api.api_stats_pool",
+                        "api.api_stats_passwords", "api.api_stats_limits", "api.api_stats_stale")
+
+    # Password hashing (app.passwords): argon2id in a per-process pool of worker processes
+    PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))                  # 0 = hash inline
+    PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "8"))          # running + queued per web process
+    PASSWORD_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_QUEUE_TIMEOUT", "5"))    # seconds before "busy"
+    ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))          # KiB
+    ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+    # Fail fast while the database is down (app.db.CircuitBreaker)
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))             # seconds per connection attempt
+    DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "3"))           # consecutive failures to open
+    DB_BREAKER_RESET = float(os.getenv("DB_BREAKER_RESET", "1"))               # first wait before a probe
+    DB_BREAKER_MAX_RESET = float(os.getenv("DB_BREAKER_MAX_RESET", "30"))      # backoff cap
+
+    # Last known good feed pages and stats (app.stale), served with Age / Warning: 110
+    # while the breaker is not closed or reads average over the latency budget
+    STALE_CACHE_ENABLED = os.getenv("STALE_CACHE_ENABLED", "1") == "1"
+    STALE_CACHE_LATENCY_BUDGET = float(os.getenv("STALE_CACHE_LATENCY_BUDGET", "0.5"))   # seconds, 0 = ignore latency
+    STALE_CACHE_MAX_AGE = int(os.getenv("STALE_CACHE_MAX_AGE", "600"))          # never serve older results
+    STALE_CACHE_MAX_ENTRIES = int(os.getenv("STALE_CACHE_MAX_ENTRIES", "256"))
+    STALE_CACHE_REFRESH_WORKERS = int(os.getenv("STALE_CACHE_REFRESH_WORKERS", "1"))     # 0 = refresh inline
+
+    # Prometheus metrics on /metrics (app.metrics). With several worker processes set
+    # PROMETHEUS_MULTIPROC_DIR to an empty directory before starting them (see gunicorn.conf.py)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    # /metrics exposes pool and breaker internals, like the admin-only /api/stats/*.
+    # Scrapers send "Authorization: Bearer <METRICS_TOKEN>" or connect from one of
+    # METRICS_ALLOWED_NETWORKS (comma-separated CIDRs; the client IP as ProxyFix sees it).
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    METRICS_ALLOWED_NETWORKS = os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128")
+
+    # Per-request SQL tracing (app.tracing)
+    SQL_TRACE_ENABLED = os.getenv("SQL_TRACE_ENABLED", "1") == "1"
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))            # logged with EXPLAIN
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))  # same statement per request
+    # Max statements per request (0 = unlimited). Exceeding it fails the request
+    # under TESTING or SQL_QUERY_BUDGET_ENFORCE, and only logs a warning otherwise.
+    SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "0"))
+    SQL_QUERY_BUDGET_ENFORCE = os.getenv("SQL_QUERY_BUDGET_ENFORCE", "0") == "1"
+
+    # Feed pagination
+    FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", "20"))
+    FEED_MAX_PAGE_SIZE = int(os.getenv("FEED_MAX_PAGE_SIZE", "100"))
+
+    # Delta sync (/api/food-posts/changes)
+    CHANGES_MAX_ROWS = int(os.getenv("CHANGES_MAX_ROWS", "500"))             # per response
+    CHANGES_OVERLAP_SECONDS = int(os.getenv("CHANGES_OVERLAP_SECONDS", "5"))  # re-read window for late commits
+
+    # In-memory "available now" feed; rebuilt after FEED_CACHE_MAX_AGE seconds so
+    # writes from other worker processes show up
+    FEED_CACHE_ENABLED = os.getenv("FEED_CACHE_ENABLED", "1") == "1"
+    FEED_CACHE_MAX_AGE = int(os.getenv("FEED_CACHE_MAX_AGE", "60"))
+
+    # Background jobs (APScheduler)
+    # Every process schedules the jobs, but only the one holding a MariaDB named lock
+    # runs them (app.scheduler.SchedulerLeader); the others retry this often to take over
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+    SCHEDULER_LEADER_RETRY = int(os.getenv("SCHEDULER_LEADER_RETRY", "30"))         # seconds
+    STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))   # seconds
+    EXPIRY_SWEEP_INTERVAL = int(os.getenv("EXPIRY_SWEEP_INTERVAL", "60"))           # seconds
+    EXPIRY_SWEEP_BATCH = int(os.getenv("EXPIRY_SWEEP_BATCH", "500"))                # posts per transaction
+    EXPIRY_SWEEP_MAX_BATCHES = int(os.getenv("EXPIRY_SWEEP_MAX_BATCHES", "20"))     # per run
+    # Once the sweeper runs, "available" can be status='active' alone. Posts may
+    # then show for up to one sweep interval past their expiry. Sweeps are single-runner:
+    # only the scheduler leader schedules them, and each holds a named lock while it runs.
+    EXPIRY_SWEEPER_TRUSTED = os.getenv("EXPIRY_SWEEPER_TRUSTED", "0") == "1"
+
+    # Server-sent events (/api/events) fed from the user_events outbox
+    EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1"))       # seconds between outbox reads
+    EVENTS_HEARTBEAT = int(os.getenv("EVENTS_HEARTBEAT", "25"))                # keep-alive comment interval
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))             # per connection before it is dropped
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "500"))   # open streams per process (0 = unlimited)
+    EVENTS_RETENTION_HOURS = int(os.getenv("EVENTS_RETENTION_HOURS", "24"))    # replay window for Last-Event-ID
+
+    # Bulk claim decisions (POST /api/claims/decisions)
+    CLAIM_BATCH_MAX = int(os.getenv("CLAIM_BATCH_MAX", "100"))     # decisions per request
+
+    # Per-user stats snapshots (/api/stats/me, /profile, /myposts)
+    USER_STATS_TTL = int(os.getenv("USER_STATS_TTL", "30"))    # seconds
+
+    # Feed search: "fulltext" uses the FULLTEXT index on posts(title, description),
+    # "like" keeps the substring scan for databases without it
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "fulltext")
+
+    # Fingerprinted static assets served from /assets with immutable caching (app.assets)
+    ASSETS_ENABLED = os.getenv("ASSETS_ENABLED", "1") == "1"
+    ASSETS_BUILD_ON_STARTUP = os.getenv("ASSETS_BUILD_ON_STARTUP", "1") == "1"   # else use `flask build-assets` output
+    ASSETS_OUTPUT = os.path.join(os.getcwd(), 'static', 'dist')
+
+    # Uploads, stored under the SHA-256 of their content (app.storage)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'uploads')
+    UPLOAD_URL = "/static/uploads"
+    UPLOAD_GC_GRACE_HOURS = int(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))   # never collect newer files
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
+
+    # Image derivatives (app.images): thumbnails and WebP versions built off the request path
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))                        # 0 = process inline
+    IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "40000000"))           # refuse larger uploads
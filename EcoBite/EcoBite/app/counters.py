@@ -0,0 +1,95 @@
+from app.db import get_db
+
+# Global aggregates kept in the stats_counters table and bumped in the same
+# transaction as the write that changes them, so reading stats never scans posts.
+# "available now" depends on the clock and is counted by the feed view instead.
+SHARED_STATUSES = ("claimed", "completed")
+
+COUNTERS = ("total_posts", "shared_posts", "claimed_posts", "shared_weight_kg")
+
+RECOMPUTE_SQL = """
+    SELECT COUNT(*),
+           COALESCE(SUM(status IN ('claimed', 'completed')), 0),
+           COALESCE(SUM(status = 'claimed'), 0),
+           COALESCE(SUM(CASE WHEN status IN ('claimed', 'completed') THEN estimated_weight_kg END), 0)
+    FROM posts
+"""
+
+
+def bump(cur, deltas):
+    """Adds deltas to counters in one statement. Zero deltas are skipped."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    values = ", ".join("(?, ?)" for _ in deltas)
+    params = [x for item in deltas.items() for x in item]
+    cur.execute(
+        f"INSERT INTO stats_counters (name, value) VALUES {values}"
+        " ON DUPLICATE KEY UPDATE value = value + VALUES(value)",
+        tuple(params),
+    )
+
+
+def post_created(cur):
+    bump(cur, {"total_posts": 1})
+
+
+def post_status_changed(cur, old_status, new_status, weight):
+    """Call in the transaction that moves a post from old_status to new_status."""
+    if old_status == new_status:
+        return
+    was_shared, is_shared = old_status in SHARED_STATUSES, new_status in SHARED_STATUSES
+    shared = int(is_shared) - int(was_shared)
+    bump(cur, {
+        "shared_posts": shared,
+        "claimed_posts": int(new_status == "claimed") - int(old_status == "claimed"),
+        "shared_weight_kg": shared * float(weight or 0),
+    })
+
+
+def read_counters(cur):
+    cur.execute("SELECT name, value FROM stats_counters")
+    values = dict.fromkeys(COUNTERS, 0)
+    values.update({name: value for name, value in cur.fetchall()})
+    return values
+
+
+def reconcile(conn):
+    """
+    Recomputes every counter from scratch, stores the true values and returns
+    the drift that was corrected ({name: actual - stored}). Counter rows are
+    locked for the duration so concurrent bumps wait instead of being lost.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT name, value FROM stats_counters FOR UPDATE")
+        stored = dict.fromkeys(COUNTERS, 0)
+        stored.update({name: value for name, value in cur.fetchall()})
+        cur.execute(RECOMPUTE_SQL)
+        actual = dict(zip(COUNTERS, (float(v or 0) for v in cur.fetchone())))
+        cur.executemany(
+            "INSERT INTO stats_counters (name, value) VALUES (?, ?)"
+            " ON DUPLICATE KEY UPDATE value = VALUES(value)",
+            list(actual.items()),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return {name: actual[name] - float(stored[name] or 0)
+            for name in COUNTERS if abs(actual[name] - float(stored[name] or 0)) > 1e-6}
+
+
+def reconcile_job():
+    """Scheduled reconciliation; reports drift rather than failing silently."""
+    conn = get_db()
+    if conn is None:
+        return
+    try:
+        drift = reconcile(conn)
+        if drift:
+            print(f"⚠️ Stats counter drift corrected: {drift}")
+    except Exception as e:
+        print("❌ Stats reconcile error:", e)
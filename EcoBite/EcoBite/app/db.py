@@ -1,53 +1,283 @@
+import os
+import time
+import threading
+from collections import deque
+
 import mariadb
 from flask import g, current_app, flash
 
+from app.tracing import traced
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class CircuitBreaker:
+    """
+    Stops hammering a database that is down. After `failure_threshold`
+    consecutive failed checkouts the circuit opens and allow() refuses at
+    once, without touching the network. Once `reset_timeout` has passed a
+    single probe is let through (half-open): success closes the circuit,
+    failure reopens it for twice as long, up to `max_reset_timeout`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=1.0, max_reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = reset_timeout
+        self._probing = False
+        self._counters = {"opened": 0, "rejected": 0}
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self._open_for:
+                self.state, self._probing = self.HALF_OPEN, False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print("✅ Database reachable again, circuit closed")
+            self.state, self._failures, self._probing = self.CLOSED, 0, False
+            self._open_for = self.reset_timeout
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                self._open_for = min(self._open_for * 2, self.max_reset_timeout)
+            elif self._failures < self.failure_threshold:
+                return
+            elif self.state == self.OPEN:
+                return
+            self.state, self._opened_at, self._probing = self.OPEN, time.monotonic(), False
+            self._counters["opened"] += 1
+            print(f"❌ Database unavailable, failing fast for {self._open_for:g}s")
+
+    def abandon(self):
+        """The probe ended without telling us anything (e.g. pool timeout); let another one try."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures,
+                    "open_for": self._open_for, **self._counters}
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of MariaDB connections.
+
+    Connections are checked out for the lifetime of a request and handed back
+    in teardown. Every checkout pings the connection first; broken connections
+    and connections older than `recycle` seconds are replaced transparently.
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, recycle=1800, breaker=None):
+        self._connect = connect
+        self.breaker = breaker or CircuitBreaker()
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = deque()        # (conn, created_at), most recently used last
+        self._born = {}             # id(conn) -> created_at for checked-out connections
+        self._in_use = 0
+        self._waiting = 0
+        self._counters = {"checkouts": 0, "connects": 0, "waits": 0,
+                          "timeouts": 0, "recycled": 0, "broken": 0}
+
+    def acquire(self):
+        """Check a healthy connection out of the pool, opening one if needed."""
+        deadline = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, created = self._idle.pop()
+                    break
+                if self._in_use < self.size:
+                    conn, created = None, None
+                    break
+                if deadline is None:
+                    self._counters["waits"] += 1
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            self._counters["checkouts"] += 1
+
+        # Health check and connect happen outside the lock so a slow server
+        # does not serialize every other checkout behind it.
+        try:
+            if conn is not None and not self._healthy(conn, created):
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                created = time.monotonic()
+                with self._cond:
+                    self._counters["connects"] += 1
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._born[id(conn)] = created
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if not discard:
+            try:
+                conn.rollback()
+            except mariadb.Error:
+                discard = True
+        with self._cond:
+            created = self._born.pop(id(conn), time.monotonic())
+            self._in_use -= 1
+            if not discard and len(self._idle) < self.size:
+                self._idle.append((conn, created))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                **self._counters,
+                "breaker": self.breaker.stats(),
+            }
+
+    def _healthy(self, conn, created):
+        if self.recycle and time.monotonic() - created > self.recycle:
+            with self._cond:
+                self._counters["recycled"] += 1
+            return False
+        try:
+            conn.ping()
+            return True
+        except mariadb.Error:
+            with self._cond:
+                self._counters["broken"] += 1
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except mariadb.Error:
+            pass
+
+
+def connect_args(config):
+    return dict(
+        user=config['DB_USER'],
+        password=config['DB_PASS'],
+        host=config['DB_HOST'],
+        port=config['DB_PORT'],
+        database=config['DB_NAME'],
+        connect_timeout=config['DB_CONNECT_TIMEOUT'],
+    )
+
+
+def get_pool(app=None):
+    """
+    Returns the connection pool for this app and process, creating it lazily.
+    A pool inherited across fork() is discarded so workers never share sockets.
+    """
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('db_pool')
+    if pool is None or pool.pid != os.getpid():
+        config = app.config
+        pool = ConnectionPool(
+            lambda: mariadb.connect(**connect_args(config)),
+            size=config['DB_POOL_SIZE'],
+            timeout=config['DB_POOL_TIMEOUT'],
+            recycle=config['DB_POOL_RECYCLE'],
+            breaker=CircuitBreaker(config['DB_BREAKER_FAILURES'], config['DB_BREAKER_RESET'],
+                                   config['DB_BREAKER_MAX_RESET']),
+        )
+        app.extensions['db_pool'] = pool
+    return pool
+
+
+def pool_stats():
+    """Snapshot of the current process's pool counters."""
+    return get_pool().stats()
+
+
+def checkout(pool):
+    """
+    Acquires a connection from `pool` through its circuit breaker. Returns
+    None when the database is unavailable; while the circuit is open that
+    answer costs no network round trip. Callers release it to the pool.
+    """
+    if not pool.breaker.allow():
+        return None
+    try:
+        conn = pool.acquire()
+    except PoolTimeout as e:
+        pool.breaker.abandon()
+        print(f"❌ Database pool exhausted: {e}")
+        return None
+    except mariadb.Error as e:
+        pool.breaker.failure()
+        print(f"❌ Database connection failed: {e}")
+        return None
+    pool.breaker.success()
+    return conn
+
+
 def get_db():
     """
-    Connects to the database if not already connected for this request.
-    Returns the connection object.
+    Checks a connection out of the pool if not already done for this request
+    (see checkout). Returns the connection object, or None when the database
+    is unavailable. The database itself is created by `python migrate_db.py`,
+    not here.
     """
     if 'db' not in g:
-        try:
-            g.db = mariadb.connect(
-                user=current_app.config['DB_USER'],
-                password=current_app.config['DB_PASS'],
-                host=current_app.config['DB_HOST'],
-                port=current_app.config['DB_PORT'],
-                database=current_app.config['DB_NAME']
-            )
-        except mariadb.Error as e:
-            # If the specific database connects fails, try to connect without DB to see if we can create it
-            # This logic mimics the original app.py behavior but scoped properly.
-            error_msg = str(e)
-            if "Unknown database" in error_msg:
-                try:
-                    conn = mariadb.connect(
-                        user=current_app.config['DB_USER'],
-                        password=current_app.config['DB_PASS'],
-                        host=current_app.config['DB_HOST'],
-                        port=current_app.config['DB_PORT']
-                    )
-                    cursor = conn.cursor()
-                    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{current_app.config['DB_NAME']}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;")
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
-                    
-                    # Retry connection
-                    g.db = mariadb.connect(
-                        user=current_app.config['DB_USER'],
-                        password=current_app.config['DB_PASS'],
-                        host=current_app.config['DB_HOST'],
-                        port=current_app.config['DB_PORT'],
-                        database=current_app.config['DB_NAME']
-                    )
-                except Exception as create_error:
-                    print(f"❌ Database creation failed: {create_error}")
-                    return None
-            else:
-                print(f"❌ Database connection failed: {e}")
-                return None
-                
+        conn = checkout(get_pool())
+        if conn is None:
+            return None
+        g.db = conn
+
     return g.db
 
 def get_cursor():
@@ -57,17 +287,28 @@ def get_cursor():
     """
     db = get_db()
     if db:
-        return db.cursor()
+        return traced(db.cursor(), db)
+    return None
+
+def get_stream_cursor():
+    """
+    Returns an unbuffered cursor: rows stay on the server until fetched, so
+    large results can be streamed (see app.streaming). No other statement may
+    run on the connection until the cursor is exhausted or closed.
+    """
+    db = get_db()
+    if db:
+        return traced(db.cursor(buffered=False), db, explain=False)
     return None
 
 def close_db(e=None):
     """
-    Closes the database connection at the end of the request.
+    Returns the request's connection to the pool at the end of the request.
     """
     db = g.pop('db', None)
 
     if db is not None:
-        db.close()
+        get_pool().release(db)
 
 def init_app(app):
     """
@@ -0,0 +1,65 @@
+import json
+
+# Dietary tags live in the post_dietary_tags junction table, PRIMARY KEY (tag, post_id),
+# so filters are index probes instead of LIKE scans over posts.dietary_json.
+# dietary_json is still written for clients that read it directly.
+
+
+def parse_tags(value):
+    """
+    Normalizes tags from a list, a JSON array string or a comma-separated
+    string into a de-duplicated list, keeping the caller's order. A string
+    that is JSON but not an array or a string ("1", "null", "true") is
+    taken as plain comma-separated text.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list):
+            value = parsed
+        elif isinstance(parsed, str):
+            value = [parsed]
+        else:
+            value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    tags = []
+    for tag in value:
+        if tag is None:
+            continue
+        tag = str(tag).strip()[:64]
+        if tag and tag.lower() not in (t.lower() for t in tags):
+            tags.append(tag)
+    return tags
+
+
+def save_tags(cur, post_id, tags):
+    """Writes a post's tags. Runs inside the caller's transaction."""
+    if tags:
+        cur.executemany(
+            "INSERT IGNORE INTO post_dietary_tags (post_id, tag) VALUES (?, ?)",
+            [(post_id, tag) for tag in tags],
+        )
+
+
+def filter_clause(tags, mode="all", alias="p"):
+    """
+    SQL fragment (and params) keeping posts that carry all (mode="all") or
+    any (mode="any") of the given tags.
+    """
+    if not tags:
+        return "", []
+    if mode == "any":
+        placeholders = ",".join("?" * len(tags))
+        return (f" AND EXISTS (SELECT 1 FROM post_dietary_tags dt"
+                f" WHERE dt.post_id={alias}.id AND dt.tag IN ({placeholders}))"), list(tags)
+    clause = "".join(
+        f" AND EXISTS (SELECT 1 FROM post_dietary_tags dt{i}"
+        f" WHERE dt{i}.tag=? AND dt{i}.post_id={alias}.id)"
+        for i in range(len(tags))
+    )
+    return clause, list(tags)
@@ -0,0 +1,268 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from app.db import checkout, get_db, get_pool
+from app.native import run_native
+
+# Sent to a subscriber's queue to make its stream end (slow consumer, shutdown).
+CLOSE = object()
+
+
+class TooManySubscribers(Exception):
+    """Raised by subscribe() once this process serves EVENTS_MAX_SUBSCRIBERS streams."""
+
+
+def emit(cur, user_id, event_type, payload):
+    """
+    Queues an event for one user in the user_events outbox. Call inside the
+    writer's transaction so the event is published if and only if it commits.
+    """
+    cur.execute("INSERT INTO user_events (user_id, type, payload) VALUES (?, ?, ?)",
+                (user_id, event_type, json.dumps(payload, default=str)))
+
+
+def emit_to_claimers(cur, post_id, event_type, payload, status="pending"):
+    """Queues one event for every user with a claim in `status` on the post."""
+    cur.execute("""
+        INSERT INTO user_events (user_id, type, payload)
+        SELECT DISTINCT claimer_id, ?, ? FROM claims WHERE post_id=? AND status=?
+    """, (event_type, json.dumps(payload, default=str), post_id, status))
+
+
+def format_sse(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class EventBroker:
+    """
+    Fans out user_events rows to this process's SSE subscribers.
+
+    A single poller reads the outbox on a short interval and only while
+    someone is subscribed, borrowing a pooled connection per poll (see
+    app.native for gevent). Subscribers are bounded queues, so an idle stream
+    costs a queue and a waiting greenlet but never a database connection.
+    Without gevent the waiting is done by a worker thread, which a stream
+    keeps for as long as it is open; `max_subscribers` caps streams per
+    process either way.
+
+    AUTO_INCREMENT ids can commit out of order; ids skipped by a poll are
+    remembered as gaps and re-read until they appear or `gap_timeout` passes
+    (a rolled-back insert leaves a permanent gap).
+    """
+
+    def __init__(self, app, poll_interval=1.0, queue_size=100, gap_timeout=10.0, batch=500,
+                 max_subscribers=0):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.gap_timeout = gap_timeout
+        self.batch = batch
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._subscribers = {}      # user_id -> set of queues
+        self._thread = None
+        self._last_id = None
+        self._gaps = {}             # missing id -> monotonic time first noticed
+
+    def subscribe(self, user_id):
+        """
+        Returns a queue that receives `user_id`'s events committed from now
+        on. When the poller is not running, the outbox head is read before
+        the queue is registered and the poller starts from it, so nothing
+        written in between is skipped. Raises TooManySubscribers at the cap.
+        """
+        q = queue.Queue(self.queue_size)
+        head = None
+        while True:
+            with self._lock:
+                if self.max_subscribers and self._count() >= self.max_subscribers:
+                    raise TooManySubscribers(f"{self.max_subscribers} event streams already open")
+                running = self._thread is not None and self._thread.is_alive()
+                if running or head is not None:
+                    self._subscribers.setdefault(user_id, set()).add(q)
+                    if not running:
+                        self._last_id, self._gaps = head, {}
+                        self._thread = threading.Thread(target=self._run, name="event-broker", daemon=True)
+                        self._thread.start()
+                    return q
+            head = self._query("SELECT COALESCE(MAX(id), 0) FROM user_events")[0][0]
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._count()
+
+    def _count(self):
+        return sum(len(s) for s in self._subscribers.values())
+
+    def replay(self, user_id, after_id, limit=500):
+        """Events for `user_id` after `after_id`, for clients resuming with Last-Event-ID."""
+        return self._query("""
+            SELECT id, user_id, type, payload FROM user_events
+            WHERE user_id=? AND id > ? ORDER BY id LIMIT ?
+        """, (user_id, after_id, limit))
+
+    def _query(self, sql, params=()):
+        # Through the circuit breaker, so an outage fails each poll fast and
+        # the poller's failures count towards opening the circuit. The pool's
+        # locks stay on this thread; only the statement runs natively.
+        pool = get_pool(self.app)
+        conn = checkout(pool)
+        if conn is None:
+            raise RuntimeError("Database unavailable")
+        try:
+            return run_native(self._fetch, conn, sql, params)
+        finally:
+            pool.release(conn)
+
+    @staticmethod
+    def _fetch(conn, sql, params):
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Stop while nobody listens; the next subscribe restarts us
+                    # and we pick up from the current head, not from history.
+                    self._thread = None
+                    self._last_id = None
+                    self._gaps.clear()
+                    return
+            try:
+                self._poll()
+            except Exception as e:
+                print("❌ Event poll error:", e)
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        now = time.monotonic()
+        for missing, since in list(self._gaps.items()):
+            if now - since > self.gap_timeout:
+                del self._gaps[missing]
+        floor = min(self._gaps) - 1 if self._gaps else self._last_id
+        for event_id, user_id, event_type, payload in self._query(
+                "SELECT id, user_id, type, payload FROM user_events WHERE id > ? ORDER BY id LIMIT ?",
+                (floor, self.batch)):
+            if event_id in self._gaps:
+                del self._gaps[event_id]
+            elif event_id > self._last_id:
+                for missing in range(self._last_id + 1, event_id):
+                    self._gaps[missing] = now
+                self._last_id = event_id
+            else:
+                continue    # already delivered
+            self._publish(user_id, (event_id, format_sse(event_id, event_type, payload)))
+
+    def _publish(self, user_id, event):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for q in subs:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Too far behind: end the stream; the browser reconnects with
+                # Last-Event-ID and catches up from the outbox.
+                self.unsubscribe(user_id, q)
+                try:
+                    q.get_nowait()
+                    q.put_nowait(CLOSE)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+def event_stream(broker, user_id, last_id=0, heartbeat=25):
+    """
+    Generator of SSE text for one user: the outbox backlog after `last_id`,
+    then live events, with a keep-alive comment every `heartbeat` seconds so
+    proxies keep the connection open. Subscribes before reading the backlog
+    so nothing falls between the two; events already replayed are skipped.
+    """
+    q = broker.subscribe(user_id)
+    try:
+        backlog = broker.replay(user_id, last_id) if last_id else []
+    except Exception:
+        broker.unsubscribe(user_id, q)
+        raise
+
+    def generate():
+        replayed = set()
+        try:
+            yield "retry: 3000\n\n"
+            for event_id, _, event_type, payload in backlog:
+                replayed.add(event_id)
+                yield format_sse(event_id, event_type, payload)
+            while True:
+                try:
+                    event = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is CLOSE:
+                    return
+                event_id, message = event
+                if event_id in replayed:
+                    replayed.discard(event_id)
+                else:
+                    yield message
+        finally:
+            broker.unsubscribe(user_id, q)
+    return generate()
+
+
+def get_broker():
+    """This process's EventBroker, created lazily (and again after fork)."""
+    app = current_app._get_current_object()
+    broker = app.extensions.get('event_broker')
+    if broker is None or broker.pid != os.getpid():
+        broker = EventBroker(app, poll_interval=app.config['EVENTS_POLL_INTERVAL'],
+                             queue_size=app.config['EVENTS_QUEUE_SIZE'],
+                             max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS'])
+        app.extensions['event_broker'] = broker
+    return broker
+
+
+def prune_events(conn, retention_hours=24, batch_size=1000):
+    """Deletes outbox rows older than `retention_hours` in small batches. Returns rows deleted."""
+    cur = conn.cursor()
+    deleted = 0
+    try:
+        while True:
+            cur.execute("DELETE FROM user_events WHERE created_at < NOW() - INTERVAL ? HOUR LIMIT ?",
+                        (retention_hours, batch_size))
+            conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < batch_size:
+                break
+    finally:
+        cur.close()
+    return deleted
+
+
+def prune_job():
+    """Scheduled outbox cleanup."""
+    conn = get_db()
+    if conn is None:
+        return
+    try:
+        prune_events(conn, current_app.config['EVENTS_RETENTION_HOURS'])
+    except Exception as e:
+        print("❌ Event prune error:", e)
@@ -0,0 +1,108 @@
+from flask import current_app
+
+from app.db import get_db
+
+
+class SweepRunning(Exception):
+    """Another process holds the sweep lock; EXPIRY_SWEEPER_TRUSTED relies on one sweeper at a time."""
+
+
+def available_condition(alias="p"):
+    """
+    SQL condition for "available now". Once the sweeper is trusted to keep
+    status current (EXPIRY_SWEEPER_TRUSTED), status alone is enough and the
+    (status, ...) indexes stay selective.
+    """
+    p = f"{alias}." if alias else ""
+    if current_app.config['EXPIRY_SWEEPER_TRUSTED']:
+        return f"{p}status='active'"
+    return f"{p}status='active' AND ({p}expires_at IS NULL OR {p}expires_at > NOW())"
+
+
+def expired_condition(alias="p"):
+    p = f"{alias}." if alias else ""
+    if current_app.config['EXPIRY_SWEEPER_TRUSTED']:
+        return f"{p}status='expired'"
+    return f"({p}status='expired' OR {p}expires_at <= NOW())"
+
+
+def sweep_expired(conn, batch_size=500, max_batches=20):
+    """
+    Moves active posts past expires_at to 'expired' and rejects their pending
+    claims, committing after each batch of at most `batch_size` posts so no
+    transaction holds many row locks. Returns (posts expired, claims rejected,
+    ids of users whose stats changed).
+
+    Only one sweep runs at a time across all processes (scheduler leader,
+    `flask sweep-expired`): it holds a MariaDB named lock for its whole run
+    and raises SweepRunning if another sweep has it.
+    """
+    cur = conn.cursor()
+    expired = rejected = 0
+    users = set()
+    lock = f"{current_app.config['DB_NAME']}.sweep_expired"
+    cur.execute("SELECT GET_LOCK(?, 0)", (lock,))
+    if cur.fetchone()[0] != 1:
+        cur.close()
+        raise SweepRunning("Another expiry sweep is running")
+    try:
+        for _ in range(max_batches):
+            cur.execute("""
+                SELECT id, user_id FROM posts
+                WHERE status='active' AND expires_at <= NOW()
+                ORDER BY expires_at LIMIT ?
+            """, (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            ids = [r[0] for r in rows]
+            placeholders = ",".join("?" * len(ids))
+
+            # Re-check the condition so posts claimed or extended meanwhile are left alone.
+            cur.execute(f"""
+                UPDATE posts SET status='expired'
+                WHERE id IN ({placeholders}) AND status='active' AND expires_at <= NOW()
+            """, tuple(ids))
+            expired += cur.rowcount
+            cur.execute(f"""
+                SELECT DISTINCT c.claimer_id FROM claims c JOIN posts p ON c.post_id=p.id
+                WHERE c.post_id IN ({placeholders}) AND c.status='pending' AND p.status='expired'
+            """, tuple(ids))
+            users.update(r[0] for r in cur.fetchall())
+            cur.execute(f"""
+                UPDATE claims c JOIN posts p ON c.post_id=p.id
+                SET c.status='rejected', c.decided_at=NOW()
+                WHERE c.post_id IN ({placeholders}) AND c.status='pending' AND p.status='expired'
+            """, tuple(ids))
+            rejected += cur.rowcount
+            conn.commit()
+            users.update(r[1] for r in rows)
+            if len(rows) < batch_size:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("SELECT RELEASE_LOCK(?)", (lock,))
+        cur.fetchall()
+        cur.close()
+    return expired, rejected, users
+
+
+def sweep_job():
+    """Scheduled expiry sweep."""
+    from app.user_stats import invalidate_user_stats
+
+    conn = get_db()
+    if conn is None:
+        return
+    try:
+        expired, rejected, users = sweep_expired(
+            conn, current_app.config['EXPIRY_SWEEP_BATCH'], current_app.config['EXPIRY_SWEEP_MAX_BATCHES'])
+        invalidate_user_stats(*users)
+        if expired:
+            print(f"🧹 Expired {expired} posts, auto-rejected {rejected} pending claims")
+    except SweepRunning:
+        pass
+    except Exception as e:
+        print("❌ Expiry sweep error:", e)
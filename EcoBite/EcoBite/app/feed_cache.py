@@ -0,0 +1,204 @@
+import heapq
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+from flask import current_app
+
+from app.db import get_cursor
+from app.dietary import parse_tags
+from app.expiry import available_condition
+from app.pagination import encode_cursor
+from app.metrics import cache_lookup
+from app.rows import rows
+from app.stale import get_stale_cache, note_stale
+
+FEED_SQL = "SELECT p.*, u.email as owner_email FROM posts p JOIN users u ON p.user_id=u.id"
+
+
+def _order_key(sort, row):
+    """Ascending key matching the SQL ORDER BY of each feed sort."""
+    if sort == "endingSoon":
+        exp = row["expires_at"]
+        return (0, 0.0, row["id"]) if exp is None else (1, exp.timestamp(), row["id"])
+    created = row["created_at"]
+    return (-(created.timestamp() if created else 0.0), -row["id"])
+
+
+class AvailableFeed:
+    """
+    In-process materialized view of the "available now" feed: active posts that
+    have not expired, joined to their owner's email.
+
+    Writers refresh single posts after they commit; a min-heap on expires_at
+    drops posts as they expire without asking the database. Each worker holds
+    its own copy, so the whole view is rebuilt every `max_age` seconds to pick
+    up writes made by other processes.
+    """
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._posts = {}        # id -> row
+        self._tags = {}         # id -> frozenset of lower-cased dietary tags
+        self._expiry = []       # (expires_at, id) min-heap, lazily cleaned
+        self._orders = {}       # sort -> (order keys, ids), rebuilt on demand
+        self.loaded_at = None
+
+    @property
+    def stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age
+
+    def rebuild(self, cur):
+        cur.execute(FEED_SQL + " WHERE " + available_condition())
+        found = rows(cur.fetchall(), cur.description)
+        with self._lock:
+            self._posts, self._tags, self._expiry, self._orders = {}, {}, [], {}
+            for row in found:
+                self._add(row)
+            self.loaded_at = time.monotonic()
+        return len(found)
+
+    def refresh_post(self, cur, post_id):
+        """Re-reads one post after a write and adds, updates or drops it."""
+        cur.execute(FEED_SQL + " WHERE p.id=?", (post_id,))
+        found = rows(cur.fetchall(), cur.description)
+        with self._lock:
+            self._remove(post_id)
+            if found and self._available(found[0], datetime.now()):
+                self._add(found[0])
+
+    def count(self, user_id=None):
+        with self._lock:
+            self._expire()
+            if user_id is None:
+                return len(self._posts)
+            return sum(1 for row in self._posts.values() if row["user_id"] == user_id)
+
+    def query(self, sort="newest", category=None, tags=(), tag_mode="all", cursor=None, limit=20):
+        """
+        Returns (page, next_cursor) with the same ordering and cursor format
+        as the SQL feed, applying filters in memory.
+        """
+        wanted = {t.lower() for t in tags}
+        category = category.lower() if category else None
+        with self._lock:
+            self._expire()
+            keys, ids = self._order(sort)
+            start = 0
+            if cursor is not None:
+                key, last_id = cursor
+                start = bisect_right(keys, _order_key(sort, {
+                    "id": last_id, "created_at": key, "expires_at": key}))
+            page = []
+            for post_id in ids[start:]:
+                row = self._posts[post_id]
+                if category and (row["category"] or "").lower() != category:
+                    continue
+                if wanted:
+                    have = self._tags[post_id]
+                    if tag_mode == "any" and not wanted & have:
+                        continue
+                    if tag_mode != "any" and not wanted <= have:
+                        continue
+                page.append(row.copy())
+                if len(page) > limit:
+                    break
+        if len(page) > limit:
+            page = page[:limit]
+            return page, encode_cursor(sort, page[-1])
+        return page, None
+
+    @staticmethod
+    def _available(row, now):
+        return row["status"] == "active" and (row["expires_at"] is None or row["expires_at"] > now)
+
+    def _add(self, row):
+        self._posts[row["id"]] = row
+        self._tags[row["id"]] = frozenset(t.lower() for t in parse_tags(row.get("dietary_json")))
+        if row["expires_at"] is not None:
+            heapq.heappush(self._expiry, (row["expires_at"], row["id"]))
+        self._orders = {}
+
+    def _remove(self, post_id):
+        # Heap entries for removed posts are skipped when they surface in _expire.
+        if self._posts.pop(post_id, None) is not None:
+            self._tags.pop(post_id, None)
+            self._orders = {}
+
+    def _expire(self):
+        now = datetime.now()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, post_id = heapq.heappop(self._expiry)
+            row = self._posts.get(post_id)
+            if row is not None and row["expires_at"] == expires_at:
+                self._remove(post_id)
+
+    def _order(self, sort):
+        if sort not in self._orders:
+            ranked = sorted((_order_key(sort, row), post_id) for post_id, row in self._posts.items())
+            self._orders[sort] = ([k for k, _ in ranked], [post_id for _, post_id in ranked])
+        return self._orders[sort]
+
+
+def get_feed(force=False):
+    """
+    Returns the app's AvailableFeed, (re)building it when missing or stale.
+    Returns None when the cache is disabled, or the database is unavailable
+    and the view was never loaded. A view that was loaded before is kept
+    as last known good: while the database is degraded it is served as is
+    (expired posts still drop out) and rebuilt in the background.
+    """
+    if not current_app.config['FEED_CACHE_ENABLED']:
+        return None
+    feed = current_app.extensions.get('available_feed')
+    if feed is None:
+        feed = current_app.extensions.setdefault(
+            'available_feed', AvailableFeed(current_app.config['FEED_CACHE_MAX_AGE']))
+    if not (force or feed.stale):
+        cache_lookup("available_feed", "hit")
+    else:
+        loaded = feed.loaded_at is not None and not force and current_app.config['STALE_CACHE_ENABLED']
+        if loaded and get_stale_cache().degraded():
+            return _serve_stale(feed)
+        started = time.monotonic()
+        cur = get_cursor()
+        if cur is None:
+            return _serve_stale(feed) if loaded else None
+        cache_lookup("available_feed", "miss")
+        try:
+            feed.rebuild(cur)
+            if current_app.config['STALE_CACHE_ENABLED']:
+                get_stale_cache().observe(time.monotonic() - started)
+        except Exception as e:
+            print("❌ Feed cache rebuild error:", e)
+            return _serve_stale(feed) if loaded else None
+    return feed
+
+
+def _serve_stale(feed):
+    cache = get_stale_cache()
+    cache.count("stale_served")
+    cache_lookup("available_feed", "stale")
+    cache.refresh("available_feed", feed.rebuild, store=False)
+    note_stale(time.monotonic() - feed.loaded_at)
+    return feed
+
+
+def feed_changed(*post_ids):
+    """
+    Call after committing a write that may change whether (or how) a post
+    appears in the available feed.
+    """
+    feed = current_app.extensions.get('available_feed')
+    if feed is None or feed.loaded_at is None:
+        return
+    cur = get_cursor()
+    if cur is None:
+        return
+    try:
+        for post_id in post_ids:
+            feed.refresh_post(cur, post_id)
+    except Exception as e:
+        print("❌ Feed cache refresh error:", e)
@@ -0,0 +1,223 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+from app.db import get_db
+from app.feed_cache import feed_changed
+from app.native import run_native
+from app.storage import get_storage
+
+# name -> (longest side in px, posts column holding its URL). Largest first:
+# each size is resized from the previous one, which is cheaper than from the original.
+DERIVATIVES = {
+    "card": (1200, "image_card_url"),
+    "thumb": (400, "image_thumb_url"),
+}
+DERIVED_PREFIX = "derived"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# JPEG segments kept when stripping: JFIF header (APP0), colour profile (APP2),
+# Adobe colour transform (APP14). Other APPn (EXIF/GPS, XMP, IPTC) and comments go.
+JPEG_KEEP = {0xE0, 0xE2, 0xEE}
+EXIF_ORIENTATION = 0x0112
+
+
+class ImageRejected(Exception):
+    """The upload is not an image we are willing to decode."""
+
+
+def derived_key(key, name, ext=".webp"):
+    """Storage key of one derivative: "3f/3fa2...c1.jpg" -> "derived/3f/3fa2...c1.thumb.webp"."""
+    return f"{DERIVED_PREFIX}/{os.path.splitext(key)[0]}.{name}{ext}"
+
+
+def _save(image, path, **options):
+    """Writes via a temp file so readers never see a half-written image."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        image.save(tmp, **options)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def strip_jpeg(src_path, dst_path, orientation=1):
+    """
+    Copies a JPEG without its metadata segments, leaving the compressed image
+    data byte for byte as it was, so stripping costs no quality. A non-default
+    EXIF orientation is carried over as the only tag of a fresh EXIF segment.
+    """
+    with open(src_path, "rb") as f:
+        data = f.read()
+    if data[:2] != b"\xff\xd8":
+        raise ImageRejected("Not a JPEG file")
+    segments, pos = [], 2
+    while True:
+        if pos + 4 > len(data) or data[pos] != 0xFF:
+            raise ImageRejected("Truncated or corrupt JPEG")
+        marker = data[pos + 1]
+        if marker == 0xFF:          # fill byte
+            pos += 1
+            continue
+        if marker == 0xDA:          # start of scan: the rest is image data
+            tail = data[pos:]
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:     # no length field
+            segments.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], "big")
+        if not (0xE0 <= marker <= 0xEF or marker == 0xFE) or marker in JPEG_KEEP:
+            segments.append(data[pos:end])
+        pos = end
+    if orientation != 1:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        payload = exif.tobytes()        # starts with b"Exif\0\0"
+        app1 = b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+        # JFIF requires its APP0 to come first.
+        at = 1 if segments and segments[0][:2] == b"\xff\xe0" else 0
+        segments.insert(at, app1)
+    tmp = f"{dst_path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(b"\xff\xd8" + b"".join(segments) + tail)
+    os.replace(tmp, dst_path)
+
+
+def make_derivatives(src_path, out_dir, stem, quality=80, max_pixels=40_000_000, strip_original=True):
+    """
+    Writes `{stem}.{name}.webp` into `out_dir` for every DERIVATIVES entry and
+    returns {name: path}. The EXIF orientation is applied first; no other
+    metadata (GPS position, camera details) is copied, only the colour profile.
+    With `strip_original` a copy of the original without its metadata is
+    written too, as {"original": path}, since the original stays downloadable.
+    JPEGs are stripped losslessly (see strip_jpeg) and PNGs re-encoded
+    losslessly; WebP has to be re-encoded, at quality 90.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    image = None
+    with Image.open(src_path) as original:
+        width, height = original.size
+        if width * height > max_pixels:
+            raise ImageRejected(f"{width}x{height} exceeds {max_pixels} pixels")
+        fmt = original.format
+        stripped = os.path.join(out_dir, stem + os.path.splitext(src_path)[1])
+        if strip_original and fmt == "JPEG":
+            strip_jpeg(src_path, stripped, original.getexif().get(EXIF_ORIENTATION, 1))
+            written["original"] = stripped
+        elif strip_original and fmt in ("PNG", "WEBP"):
+            image = _clean(ImageOps.exif_transpose(original))
+            options = {"PNG": {"optimize": True}, "WEBP": {"quality": 90}}[fmt]
+            _save(image, stripped, format=fmt, icc_profile=image.info.get("icc_profile"), **options)
+            written["original"] = stripped
+        if image is None:
+            largest = max(size for size, _ in DERIVATIVES.values())
+            # JPEG can decode at 1/2, 1/4 or 1/8 scale directly, skipping most of the work.
+            original.draft("RGB", (largest, largest))
+            image = _clean(ImageOps.exif_transpose(original))
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    for name, (size, _) in sorted(DERIVATIVES.items(), key=lambda item: -item[1][0]):
+        image.thumbnail((size, size), Image.LANCZOS)
+        path = os.path.join(out_dir, f"{stem}.{name}.webp")
+        _save(image, path, format="WEBP", quality=quality, method=4,
+              icc_profile=image.info.get("icc_profile"))
+        written[name] = path
+    return written
+
+
+def _clean(image):
+    """Drops all metadata but the colour profile (and PNG/GIF transparency)."""
+    image.info = {k: v for k, v in image.info.items() if k in ("icc_profile", "transparency")}
+    return image
+
+
+class ImageProcessor:
+    """
+    Generates post image derivatives on a small thread pool, off the request
+    path. Pillow releases the GIL while decoding, resizing and encoding, so
+    threads run in parallel without a process pool's pickling and fork cost.
+    Under gevent workers the pool's threads are greenlets, so the Pillow work
+    itself is handed to native threads (app.native); decoding a 16 MB upload
+    on the hub would stall every request and stream in the worker.
+
+    A post's derivative columns stay NULL until its job finishes; clients fall
+    back to image_url meanwhile and pick the new URLs up through delta sync,
+    since the UPDATE bumps updated_at.
+    """
+
+    def __init__(self, app, workers=2):
+        self.app = app
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="images") if workers else None
+
+    def submit(self, post_id, key, image_url):
+        if self._executor is None:
+            self._run(post_id, key, image_url)
+            return None
+        return self._executor.submit(self._run, post_id, key, image_url)
+
+    def _run(self, post_id, key, image_url):
+        with self.app.app_context():
+            try:
+                process_post_image(post_id, key, image_url)
+            except Exception as e:
+                print(f"❌ Image processing error for post {post_id}: {e}")
+
+
+def process_post_image(post_id, key, image_url):
+    """
+    Builds the derivatives for one post's image (stored under `key`) and
+    records their URLs. An image re-posted with the same content already has
+    its derivatives, so only the post is updated. Needs an app context.
+
+    The metadata-free copy of the original is a derivative too, stored next
+    to the others; image_url is repointed to it. The upload itself is never
+    rewritten, since its key is the hash of its bytes, and gc-uploads removes
+    it once no post refers to it any more.
+    """
+    config = current_app.config
+    storage = get_storage()
+    keys = {name: derived_key(key, name) for name in DERIVATIVES}
+    original_key = derived_key(key, "original", os.path.splitext(key)[1])
+    if not all(storage.exists(k) for k in keys.values()):
+        with tempfile.TemporaryDirectory(dir=storage.temp_dir()) as tmp:
+            stem = os.path.splitext(os.path.basename(key))[0]
+            written = run_native(make_derivatives, storage.local_path(key), tmp, stem,
+                                 config['IMAGE_WEBP_QUALITY'], config['IMAGE_MAX_PIXELS'])
+            # Derived keys are a function of the upload's content, so an existing
+            # one already holds these bytes and is kept as is.
+            for name, path in written.items():
+                storage.put(original_key if name == "original" else keys[name], path)
+
+    conn = get_db()
+    if conn is None:
+        raise RuntimeError("Database unavailable")
+    columns = {DERIVATIVES[name][1]: storage.url(k) for name, k in keys.items()}
+    if storage.exists(original_key):
+        columns["image_url"] = storage.url(original_key)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"UPDATE posts SET {', '.join(f'{c}=?' for c in columns)} WHERE id=? AND image_url=?",
+                    (*columns.values(), post_id, image_url))
+        conn.commit()
+    finally:
+        cur.close()
+    feed_changed(post_id)
+    return keys
+
+
+def get_processor():
+    """This process's ImageProcessor, created lazily (and again after fork)."""
+    app = current_app._get_current_object()
+    processor = app.extensions.get('image_processor')
+    if processor is None or processor.pid != os.getpid():
+        processor = ImageProcessor(app, workers=app.config['IMAGE_WORKERS'])
+        app.extensions['image_processor'] = processor
+    return processor
@@ -0,0 +1,213 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, flash, g, jsonify, redirect, request, session, url_for
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(text):
+    """
+    "10/minute" -> (tokens per second, burst). The burst is the full count, so
+    a client may spend its whole budget at once and then refills steadily.
+    Empty or "0" means unlimited (None).
+    """
+    if not text or text.strip() == "0":
+        return None
+    count, _, period = text.partition("/")
+    seconds = PERIODS.get(period.strip().rstrip("s") or "second")
+    if seconds is None or int(count) <= 0:
+        raise ValueError(f"Invalid rate: {text!r}")
+    return int(count) / seconds, int(count)
+
+
+class TokenBuckets:
+    """
+    In-process token buckets, one per key. A bucket is just (tokens, last
+    refill time), refilled lazily on use. The least recently used keys are
+    dropped beyond `max_keys`, which at worst hands a fresh budget to a
+    client that has been quiet for a while.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.rejected = 0
+
+    def take(self, keys, rate, burst, now=None):
+        """
+        Spends one token from each of `keys` (a key or a list of keys), or
+        from none of them: a request refused by one bucket does not drain
+        the others. Returns 0 if allowed, else the seconds until every
+        bucket has a token.
+        """
+        keys = [keys] if isinstance(keys, tuple) else keys
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            levels = {}
+            for key in keys:
+                tokens, last = self._buckets.pop(key, (burst, now))
+                levels[key] = min(burst, tokens + (now - last) * rate)
+            wait = max((1 - tokens) / rate for tokens in levels.values()) if levels else 0.0
+            if wait > 0:
+                self.rejected += 1
+            else:
+                wait = 0.0
+                levels = {key: tokens - 1 for key, tokens in levels.items()}
+            for key, tokens in levels.items():
+                self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def _limiter():
+    app = current_app._get_current_object()
+    buckets = app.extensions.get('rate_limits')
+    if buckets is None:
+        buckets = app.extensions['rate_limits'] = TokenBuckets(app.config['RATE_LIMIT_MAX_KEYS'])
+    return buckets
+
+
+def _too_many(retry_after):
+    """
+    429 for the API. Form posts are sent back to the page they came from with
+    a flash message; not to request.path, which may be a POST-only route.
+    """
+    retry_after = max(1, math.ceil(retry_after))
+    if request.blueprint != "api":
+        flash(f"Too many attempts. Please wait {retry_after} seconds and try again.", "error")
+        return redirect(request.referrer or url_for("main.home"))
+    response = jsonify({"error": "Too many requests", "retry_after": retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def rate_limit(name, methods=("POST", "PUT", "PATCH", "DELETE")):
+    """
+    View decorator charging one token from the RATE_LIMIT_<NAME> budget
+    ("10/minute") per call, per client IP and, when signed in, per user.
+    Only `methods` are limited, so e.g. GET /login stays free.
+    """
+    setting = f"RATE_LIMIT_{name.upper()}"
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if config['RATE_LIMIT_ENABLED'] and request.method in methods:
+                budget = parse_rate(config[setting])
+                if budget is not None:
+                    keys = [(name, "ip", request.remote_addr)]
+                    if "user_id" in session:
+                        keys.append((name, "user", session["user_id"]))
+                    wait = _limiter().take(keys, *budget)
+                    if wait:
+                        return _too_many(wait)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class AdmissionController:
+    """
+    Sheds load before a request starts work: once this process is serving
+    `max_in_flight` requests, or `max_db_waiting` requests are already queued
+    for a pooled connection, new requests get 503 + Retry-After straight
+    away. Failing fast keeps latency bounded for the requests that are
+    admitted instead of letting every request slow down together.
+    """
+
+    def __init__(self, max_in_flight=0, max_db_waiting=0, retry_after=2):
+        self.max_in_flight = max_in_flight
+        self.max_db_waiting = max_db_waiting
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def try_enter(self, db_waiting):
+        """Counts the request in and returns None, or returns why it is refused."""
+        with self._lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                reason = "in_flight"
+            elif self.max_db_waiting and db_waiting >= self.max_db_waiting:
+                reason = "db_waiting"
+            else:
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            self.shed += 1
+            return reason
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self.in_flight, "admitted": self.admitted, "shed": self.shed,
+                    "max_in_flight": self.max_in_flight, "max_db_waiting": self.max_db_waiting}
+
+
+def _admit():
+    if request.endpoint is None or request.endpoint in current_app.config['ADMISSION_EXEMPT']:
+        return None
+    controller = current_app.extensions['admission']
+    # Reads the pool's counters only; never opens a connection.
+    pool = current_app.extensions.get('db_pool')
+    waiting = pool.stats()["waiting"] if pool is not None and pool.pid == os.getpid() else 0
+    reason = controller.try_enter(waiting)
+    if reason is not None:
+        current_app.logger.warning("Shedding %s %s (%s)", request.method, request.path, reason)
+        if request.blueprint == "api":
+            response = jsonify({"error": "Server busy, try again shortly", "retry_after": controller.retry_after})
+        else:
+            response = current_app.response_class("Server busy, please try again in a moment.",
+                                                  mimetype="text/plain")
+        response.status_code = 503
+        response.headers["Retry-After"] = str(controller.retry_after)
+        return response
+    g.admitted = True
+    return None
+
+
+def _release(exc=None):
+    if g.pop('admitted', False):
+        current_app.extensions['admission'].leave()
+
+
+def limit_stats():
+    """Admission controller and rate limiter counters for this process."""
+    admission = current_app.extensions.get('admission')
+    buckets = current_app.extensions.get('rate_limits')
+    return {
+        "admission": admission.stats() if admission is not None else None,
+        "rate_limited": buckets.rejected if buckets is not None else 0,
+        "rate_limit_keys": len(buckets) if buckets is not None else 0,
+    }
+
+
+def init_app(app):
+    """
+    Installs the admission controller (ADMISSION_MAX_IN_FLIGHT /
+    ADMISSION_MAX_DB_WAITING, 0 = off). Rate limits are per view, via
+    @rate_limit.
+    """
+    controller = AdmissionController(app.config['ADMISSION_MAX_IN_FLIGHT'],
+                                     app.config['ADMISSION_MAX_DB_WAITING'],
+                                     app.config['ADMISSION_RETRY_AFTER'])
+    app.extensions['admission'] = controller
+    if controller.max_in_flight or controller.max_db_waiting:
+        app.before_request(_admit)
+        app.teardown_request(_release)
@@ -0,0 +1,70 @@
+from flask import g
+
+# Keys per IN (...) list; larger batches are split into several grouped queries.
+MAX_BATCH = 500
+
+
+class BatchLoader:
+    """
+    Resolves per-row lookups (e.g. claim counts per post) with
+    one grouped query instead of one query per row.
+
+    `fetch(cur, keys)` must return {key: value} for the keys it found; keys it
+    did not find get `default()`. Results are memoized for the loader's lifetime,
+    which for loaders obtained through get_loader() is one request.
+    """
+
+    def __init__(self, fetch, default=lambda: None):
+        self._fetch = fetch
+        self._default = default
+        self._cache = {}
+
+    def load_many(self, cur, keys):
+        keys = list(keys)
+        missing = list(dict.fromkeys(k for k in keys if k not in self._cache))
+        for i in range(0, len(missing), MAX_BATCH):
+            chunk = missing[i:i + MAX_BATCH]
+            found = self._fetch(cur, chunk)
+            for key in chunk:
+                self._cache[key] = found[key] if key in found else self._default()
+        return [self._cache[k] for k in keys]
+
+    def load(self, cur, key):
+        return self.load_many(cur, [key])[0]
+
+    def clear(self, *keys):
+        """Forget cached values (all of them if no keys are given), e.g. after a write."""
+        if not keys:
+            self._cache.clear()
+        for key in keys:
+            self._cache.pop(key, None)
+
+
+def _placeholders(keys):
+    return ",".join("?" * len(keys))
+
+
+def fetch_claims_summaries(cur, post_ids):
+    cur.execute(f"""
+        SELECT post_id,
+            COUNT(CASE WHEN status='pending' THEN 1 END) as pending,
+            COUNT(CASE WHEN status='approved' THEN 1 END) as accepted,
+            COUNT(CASE WHEN status='rejected' THEN 1 END) as rejected
+        FROM claims WHERE post_id IN ({_placeholders(post_ids)})
+        GROUP BY post_id
+    """, tuple(post_ids))
+    return {row[0]: {"pending": row[1], "accepted": row[2], "rejected": row[3]} for row in cur.fetchall()}
+
+
+LOADERS = {
+    "claims_summary": (fetch_claims_summaries, lambda: {"pending": 0, "accepted": 0, "rejected": 0}),
+}
+
+
+def get_loader(name):
+    """The request-scoped BatchLoader registered under `name` in LOADERS."""
+    loaders = g.setdefault('loaders', {})
+    if name not in loaders:
+        fetch, default = LOADERS[name]
+        loaders[name] = BatchLoader(fetch, default)
+    return loaders[name]
@@ -0,0 +1,129 @@
+import hmac
+import ipaddress
+import os
+import time
+
+from flask import Blueprint, Response, abort, current_app, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+
+bp = Blueprint('metrics', __name__)
+
+# Request latencies worth telling apart, from a cached feed page to a stuck DB.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# With PROMETHEUS_MULTIPROC_DIR set (before the app is imported) every worker
+# process writes its values to files there and /metrics adds them up; gauges
+# say how. Without it the values are this process's only.
+REQUESTS = Counter("ecobite_http_requests_total", "Requests served",
+                   ["method", "endpoint", "status"])
+LATENCY = Histogram("ecobite_http_request_duration_seconds", "Time to build the response",
+                    ["method", "endpoint"], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge("ecobite_http_requests_in_flight", "Requests being served",
+                  ["endpoint"], multiprocess_mode="livesum")
+DB_TIME = Histogram("ecobite_db_time_seconds", "Time spent in SQL statements per request",
+                    ["endpoint"], buckets=DB_BUCKETS)
+DB_QUERIES = Histogram("ecobite_db_queries_per_request", "SQL statements per request",
+                       ["endpoint"], buckets=(0, 1, 2, 3, 5, 10, 20, 50))
+POOL = Gauge("ecobite_db_pool_connections", "Pooled connections by state (waiting = requests queued)",
+             ["state"], multiprocess_mode="livesum")
+BREAKER_OPEN = Gauge("ecobite_db_breaker_open", "Worker processes whose DB circuit breaker is not closed",
+                     multiprocess_mode="livesum")
+CACHE = Counter("ecobite_cache_lookups_total", "Cache lookups by outcome (hit, miss, stale)",
+                ["cache", "result"])
+
+
+def cache_lookup(cache, result):
+    """Counts one lookup in `cache`; the hit ratio is hit / sum over results."""
+    CACHE.labels(cache, result).inc()
+
+
+def _endpoint():
+    # Unmatched URLs share one label so scanners cannot blow up the series count.
+    return request.endpoint or "unmatched"
+
+
+def _sample_pool():
+    """Pool gauges as an arriving request sees them; reads counters only, never connects."""
+    pool = current_app.extensions.get('db_pool')
+    if pool is not None and pool.pid == os.getpid():
+        stats = pool.stats()
+        for state in ("in_use", "idle", "waiting"):
+            POOL.labels(state).set(stats[state])
+        BREAKER_OPEN.set(stats["breaker"]["state"] != "closed")
+
+
+def _start():
+    g.metrics_started = time.perf_counter()
+    g.metrics_endpoint = _endpoint()
+    IN_FLIGHT.labels(g.metrics_endpoint).inc()
+    _sample_pool()
+
+
+def _record(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    endpoint = g.metrics_endpoint
+    LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+    REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+    trace = g.get('sql_trace')
+    if trace is not None:
+        DB_TIME.labels(endpoint).observe(trace.total)
+        DB_QUERIES.labels(endpoint).observe(trace.count)
+    return response
+
+
+def _finish(exc=None):
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is not None:
+        IN_FLIGHT.labels(endpoint).dec()
+
+
+def _scrape_allowed():
+    """True for the METRICS_TOKEN bearer or a client inside METRICS_ALLOWED_NETWORKS."""
+    config = current_app.config
+    token = config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    try:
+        client = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    return any(client in ipaddress.ip_network(net.strip(), strict=False)
+               for net in config['METRICS_ALLOWED_NETWORKS'].split(",") if net.strip())
+
+
+@bp.get("/metrics")
+def metrics():
+    """Prometheus text format, summed over all worker processes in multiprocess mode."""
+    if not _scrape_allowed():
+        abort(403)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def child_exit(server, worker):
+    """gunicorn hook (see gunicorn.conf.py): drops a dead worker's live gauges."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def init_app(app):
+    """
+    Per-endpoint request counts, latency histograms, in-flight gauges and
+    DB time (from app.tracing), plus pool and cache gauges, on /metrics.
+    Register before the other before_request hooks so requests they turn
+    away (e.g. shed with 503) are counted too.
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.register_blueprint(bp)
+    app.before_request(_start)
+    app.after_request(_record)
+    app.teardown_request(_finish)
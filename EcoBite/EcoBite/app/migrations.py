@@ -0,0 +1,354 @@
+import os
+from collections import namedtuple
+
+import mariadb
+
+from app.counters import reconcile
+from app.dietary import parse_tags
+from app.quantities import parse_quantity
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), "..", "db", "schema.sql")
+
+# A migration is an ordered list of steps: SQL strings, Blocking DDL, or
+# callables taking the connection for data backfills. Every step must be safe
+# to re-run, because MariaDB commits DDL implicitly and a failed migration is
+# simply retried.
+Migration = namedtuple("Migration", "version name steps")
+
+# DDL that cannot run online on a populated `table`, given without an
+# ALGORITHM/LOCK clause; see _run_blocking.
+Blocking = namedtuple("Blocking", "table sql")
+
+
+class MaintenanceRequired(Exception):
+    """A Blocking step would lock a populated table and blocking was not allowed."""
+
+
+def _sql_file(path):
+    def apply(conn):
+        with open(path, encoding="utf-8") as f:
+            script = "\n".join(line for line in f if not line.lstrip().startswith("--"))
+        cur = conn.cursor()
+        for statement in script.split(";"):
+            if statement.strip():
+                cur.execute(statement)
+        cur.close()
+    apply.__doc__ = f"Apply {os.path.basename(path)}"
+    return apply
+
+
+def backfill_dietary_tags(conn, batch_size=1000):
+    """Copies tags from posts.dietary_json into post_dietary_tags in id-ordered batches."""
+    cur = conn.cursor()
+    last_id = 0
+    while True:
+        cur.execute("SELECT id, dietary_json FROM posts WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        pairs = [(post_id, tag) for post_id, raw in rows for tag in parse_tags(raw)]
+        if pairs:
+            cur.executemany("INSERT IGNORE INTO post_dietary_tags (post_id, tag) VALUES (?, ?)", pairs)
+        conn.commit()
+        last_id = rows[-1][0]
+    cur.close()
+
+
+def backfill_quantities(conn, batch_size=1000):
+    """
+    Parses posts.quantity and claims.requested_quantity into the numeric
+    columns. Only rows whose amount is still NULL are written: the app keeps
+    the amount up to date once it is set, and an approval decrementing a post
+    between our read and our write must not be undone.
+    """
+    cur = conn.cursor()
+    # Keeping posts.updated_at means delta-sync clients do not refetch every post.
+    for table, text_col, updates, amount_col in (
+            ("posts", "quantity", "quantity_amount=?, quantity_unit=?, updated_at=updated_at", "quantity_amount"),
+            ("claims", "requested_quantity", "requested_amount=?", "requested_amount")):
+        last_id = 0
+        while True:
+            cur.execute(f"SELECT id, {text_col} FROM {table} WHERE id > ? AND {amount_col} IS NULL"
+                        " ORDER BY id LIMIT ?", (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            params = []
+            for row_id, text in rows:
+                amount, unit = parse_quantity(text)
+                if amount is not None:
+                    params.append((amount, unit, row_id) if table == "posts" else (amount, row_id))
+            if params:
+                cur.executemany(f"UPDATE {table} SET {updates} WHERE id=? AND {amount_col} IS NULL", params)
+            conn.commit()
+            last_id = rows[-1][0]
+    cur.close()
+
+
+def seed_stats_counters(conn):
+    reconcile(conn)
+
+
+# Every ALTER pins the algorithm it was written for, so MariaDB refuses the
+# statement instead of quietly falling back to a table copy that blocks writes.
+# Index builds use ALGORITHM=INPLACE, LOCK=NONE so reads and writes continue
+# while the index is built; nullable columns with constant defaults are added
+# with ALGORITHM=INSTANT, a metadata-only change.
+#
+# posts has a FULLTEXT index (and so InnoDB's hidden FTS_DOC_ID column) since
+# migration 3. Adding a column to it is neither instant nor lock-free: the
+# table is rebuilt under LOCK=SHARED, which blocks writes for the whole
+# rebuild. Those steps are Blocking and need a maintenance window (see
+# db/README.md).
+#
+# The runner also caps lock_wait_timeout so a DDL statement stuck behind a
+# long transaction fails fast instead of queueing every other query behind its
+# metadata lock. That only bounds the wait; it does nothing for a statement
+# that holds the lock while it rebuilds.
+ONLINE = "ALGORITHM=INPLACE, LOCK=NONE"
+INSTANT = "ALGORITHM=INSTANT"
+
+MIGRATIONS = [
+    Migration(1, "baseline tables", [_sql_file(SCHEMA_FILE)]),
+    # Runs before posts has its FULLTEXT index, so these are still instant.
+    Migration(2, "post details and requested quantity", [
+        f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS title VARCHAR(255) DEFAULT NULL, {INSTANT}",
+        f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS estimated_weight_kg FLOAT DEFAULT 0, {INSTANT}",
+        f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS pickup_window_start DATETIME DEFAULT NULL, {INSTANT}",
+        f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS pickup_window_end DATETIME DEFAULT NULL, {INSTANT}",
+        f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS image_url VARCHAR(255) DEFAULT NULL, {INSTANT}",
+        f"ALTER TABLE claims ADD COLUMN IF NOT EXISTS requested_quantity VARCHAR(255) DEFAULT NULL, {INSTANT}",
+    ]),
+    Migration(3, "full-text search index", [
+        # The first FULLTEXT index rebuilds the table, which InnoDB can only do with LOCK=SHARED.
+        Blocking("posts", "ALTER TABLE posts ADD FULLTEXT INDEX IF NOT EXISTS"
+                          " ft_posts_title_description (title, description)"),
+    ]),
+    Migration(4, "dietary tags junction table", [
+        """
+        CREATE TABLE IF NOT EXISTS post_dietary_tags (
+            post_id INT NOT NULL,
+            tag VARCHAR(64) NOT NULL,
+            PRIMARY KEY (tag, post_id),
+            KEY idx_post_dietary_tags_post (post_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        backfill_dietary_tags,
+    ]),
+    Migration(5, "stats counters", [
+        """
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name VARCHAR(64) NOT NULL PRIMARY KEY,
+            value DOUBLE NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB
+        """,
+        seed_stats_counters,
+    ]),
+    Migration(6, "hot-path indexes", [
+        # Available feed (status + expiry) and newest-first pages within a status.
+        f"ALTER TABLE posts ADD INDEX IF NOT EXISTS idx_posts_status_expires (status, expires_at), {ONLINE}",
+        f"ALTER TABLE posts ADD INDEX IF NOT EXISTS idx_posts_status_created (status, created_at, id), {ONLINE}",
+        # /myposts and per-user stats.
+        f"ALTER TABLE posts ADD INDEX IF NOT EXISTS idx_posts_user_created (user_id, created_at), {ONLINE}",
+        # /api/claims/mine, claim summaries per post.
+        f"ALTER TABLE claims ADD INDEX IF NOT EXISTS idx_claims_claimer_created (claimer_id, created_at), {ONLINE}",
+        f"ALTER TABLE claims ADD INDEX IF NOT EXISTS idx_claims_post_status (post_id, status), {ONLINE}",
+    ]),
+    Migration(7, "row change timestamps for delta sync", [
+        # Microsecond precision keeps (updated_at, id) ordering stable for sync tokens.
+        Blocking("posts", "ALTER TABLE posts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP(6) NOT NULL"
+                          " DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"),
+        f"ALTER TABLE posts ADD INDEX IF NOT EXISTS idx_posts_updated (updated_at, id), {ONLINE}",
+    ]),
+    Migration(8, "user event outbox", [
+        """
+        CREATE TABLE IF NOT EXISTS user_events (
+            id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            type VARCHAR(32) NOT NULL,
+            payload JSON NOT NULL,
+            created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            KEY idx_user_events_user (user_id, id),
+            KEY idx_user_events_created (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+    ]),
+    Migration(9, "numeric quantities", [
+        # Instant on claims; posts is rebuilt because of its FULLTEXT index.
+        Blocking("posts", "ALTER TABLE posts ADD COLUMN IF NOT EXISTS quantity_amount DECIMAL(10,2) DEFAULT NULL,"
+                          " ADD COLUMN IF NOT EXISTS quantity_unit VARCHAR(32) DEFAULT NULL"),
+        f"ALTER TABLE claims ADD COLUMN IF NOT EXISTS requested_amount DECIMAL(10,2) DEFAULT NULL, {INSTANT}",
+        backfill_quantities,
+    ]),
+    Migration(10, "image derivatives", [
+        Blocking("posts", "ALTER TABLE posts ADD COLUMN IF NOT EXISTS image_thumb_url VARCHAR(255) DEFAULT NULL,"
+                          " ADD COLUMN IF NOT EXISTS image_card_url VARCHAR(255) DEFAULT NULL"),
+    ]),
+]
+
+# What `verify` expects the live schema to contain once every migration is applied.
+EXPECTED_SCHEMA = {
+    "users": {
+        "columns": {"id", "email", "password_hash", "role", "created_at"},
+        "indexes": {"PRIMARY", "uq_users_email"},
+    },
+    "posts": {
+        "columns": {"id", "user_id", "title", "description", "category", "quantity",
+                    "estimated_weight_kg", "dietary_json", "location", "expiry_minutes",
+                    "pickup_window_start", "pickup_window_end", "expires_at", "status",
+                    "image_url", "created_at", "updated_at", "quantity_amount", "quantity_unit",
+                    "image_thumb_url", "image_card_url"},
+        "indexes": {"PRIMARY", "ft_posts_title_description", "idx_posts_status_expires",
+                    "idx_posts_status_created", "idx_posts_user_created", "idx_posts_updated"},
+    },
+    "claims": {
+        "columns": {"id", "post_id", "claimer_id", "message", "requested_quantity", "status",
+                    "created_at", "decided_at", "requested_amount"},
+        "indexes": {"PRIMARY", "uq_claims_post_claimer", "idx_claims_claimer_created",
+                    "idx_claims_post_status"},
+    },
+    "post_dietary_tags": {
+        "columns": {"post_id", "tag"},
+        "indexes": {"PRIMARY", "idx_post_dietary_tags_post"},
+    },
+    "stats_counters": {
+        "columns": {"name", "value"},
+        "indexes": {"PRIMARY"},
+    },
+    "user_events": {
+        "columns": {"id", "user_id", "type", "payload", "created_at"},
+        "indexes": {"PRIMARY", "idx_user_events_user", "idx_user_events_created"},
+    },
+    "schema_version": {
+        "columns": {"version", "name", "applied_at"},
+        "indexes": {"PRIMARY"},
+    },
+}
+
+
+def ensure_version_table(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT NOT NULL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    """)
+    conn.commit()
+    cur.close()
+
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM schema_version")
+    versions = {row[0] for row in cur.fetchall()}
+    cur.close()
+    return versions
+
+
+def _run_blocking(cur, step, allow_blocking):
+    """
+    Runs a Blocking step. An empty table, or allow_blocking (a maintenance
+    window), runs it with LOCK=SHARED: reads continue, writes wait for the
+    rebuild. Otherwise it is tried with ALGORITHM=INSTANT, which succeeds
+    only when there is nothing to do (IF NOT EXISTS), and MariaDB's refusal
+    becomes MaintenanceRequired.
+    """
+    cur.execute(f"SELECT 1 FROM {step.table} LIMIT 1")
+    empty = cur.fetchone() is None
+    if allow_blocking or empty:
+        cur.execute(f"{step.sql}, LOCK=SHARED")
+        return
+    try:
+        cur.execute(f"{step.sql}, {INSTANT}")
+    except mariadb.Error as e:
+        raise MaintenanceRequired(
+            f"{step.table} would be rebuilt with writes blocked ({e}). Re-run with --allow-blocking "
+            f"in a maintenance window, or apply the change with an online schema-change tool:\n  {step.sql}") from e
+
+
+def upgrade(conn, target=None, lock_wait_timeout=10, allow_blocking=False, log=print):
+    """
+    Applies pending migrations in version order up to `target` (default: all).
+    Returns the list of versions applied. Raises MaintenanceRequired at a
+    Blocking step on a populated table unless `allow_blocking`.
+    """
+    done = applied_versions(conn)
+    cur = conn.cursor()
+    cur.execute(f"SET SESSION lock_wait_timeout = {int(lock_wait_timeout)}")
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        log(f"Applying {migration.version:04d} {migration.name}...")
+        for step in migration.steps:
+            if callable(step):
+                step(conn)
+            elif isinstance(step, Blocking):
+                _run_blocking(cur, step, allow_blocking)
+            else:
+                cur.execute(step)
+        cur.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                    (migration.version, migration.name))
+        conn.commit()
+        applied.append(migration.version)
+    cur.close()
+    return applied
+
+
+def status(conn):
+    """[(version, name, applied?)] for every known migration."""
+    done = applied_versions(conn)
+    return [(m.version, m.name, m.version in done) for m in MIGRATIONS]
+
+
+def verify(conn):
+    """
+    Diffs the live schema against EXPECTED_SCHEMA. Returns a list of
+    (severity, message) where severity is "missing" or "extra".
+
+    Indexes named after a foreign key are ignored: InnoDB creates them when
+    no other index leads with the FK columns and drops them again once one
+    does (as migration 6 adds), so whether they exist is not ours to check.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+    """)
+    columns = {}
+    for table, column in cur.fetchall():
+        columns.setdefault(table, set()).add(column)
+    cur.execute("""
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+    """)
+    indexes = {}
+    for table, index in cur.fetchall():
+        indexes.setdefault(table, set()).add(index)
+    cur.execute("""
+        SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE()
+    """)
+    for table, constraint in cur.fetchall():
+        indexes.get(table, set()).discard(constraint)
+    cur.close()
+
+    problems = []
+    for table, expected in EXPECTED_SCHEMA.items():
+        if table not in columns:
+            problems.append(("missing", f"table {table}"))
+            continue
+        for column in sorted(expected["columns"] - columns[table]):
+            problems.append(("missing", f"column {table}.{column}"))
+        for column in sorted(columns[table] - expected["columns"]):
+            problems.append(("extra", f"column {table}.{column}"))
+        for index in sorted(expected["indexes"] - indexes.get(table, set())):
+            problems.append(("missing", f"index {table}.{index}"))
+        for index in sorted(indexes.get(table, set()) - expected["indexes"]):
+            problems.append(("extra", f"index {table}.{index}"))
+    for table in sorted(set(columns) - set(EXPECTED_SCHEMA)):
+        problems.append(("extra", f"table {table}"))
+    return problems
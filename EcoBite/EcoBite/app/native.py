@@ -0,0 +1,20 @@
+import sys
+
+
+def run_native(func, *args):
+    """
+    Runs C code that gevent cannot make cooperative: calls into the MariaDB
+    driver, Pillow's decoders and encoders. Under a monkey-patched gevent
+    worker it runs on the hub's pool of native threads, so the worker's other
+    greenlets (every request and open stream) keep running meanwhile;
+    otherwise it simply runs here.
+
+    `func` must not touch gevent-patched primitives (locks, queues) itself;
+    those belong to the hub's thread.
+    """
+    if "gevent" in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            import gevent
+            return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
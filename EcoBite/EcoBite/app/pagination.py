@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+
+# Sort key column for each supported feed ordering. `p.id` is always the tiebreaker
+# so the (key, id) pair is unique and pages never skip or repeat rows.
+SORT_KEYS = {
+    "newest": "created_at",
+    "endingSoon": "expires_at",
+    "relevance": "relevance",   # full-text score, only valid alongside a search
+}
+
+
+def normalize_sort(sort):
+    """Anything we don't recognise falls back to newest-first, like the old query."""
+    return sort if sort in SORT_KEYS else "newest"
+
+
+def page_limit(raw, default=20, maximum=100):
+    """Parses the ?limit= argument, clamped to [1, maximum]."""
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(sort, row):
+    """
+    Builds an opaque cursor pointing just after `row` for the given sort.
+    """
+    key = row[SORT_KEYS[sort]]
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps({"s": sort, "k": key, "id": row["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """
+    Returns (key, id) from a cursor, or raises ValueError if it is malformed
+    or was issued for a different sort order.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, last_id = data["k"], int(data["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if data.get("s") != sort:
+        raise ValueError("Cursor does not match sort order")
+    if key is not None:
+        key = float(key) if sort == "relevance" else datetime.fromisoformat(key)
+    return key, last_id
+
+
+def keyset_clause(sort, cursor, alias="p", key_sql=None, key_params=()):
+    """
+    SQL fragment (and params) selecting rows strictly after `cursor`.
+    `key_sql` replaces the sort column for computed keys such as relevance,
+    with `key_params` bound each time the expression appears.
+    """
+    key, last_id = cursor
+    if key_sql:
+        params = [*key_params, key, *key_params, key, last_id]
+        return f" AND ({key_sql} < ? OR ({key_sql} = ? AND {alias}.id < ?))", params
+    col = f"{alias}.{SORT_KEYS[sort]}"
+    if sort == "endingSoon":
+        # expires_at sorts ascending with NULLs first (MariaDB default).
+        if key is None:
+            return f" AND (({col} IS NULL AND {alias}.id > ?) OR {col} IS NOT NULL)", [last_id]
+        return f" AND ({col} > ? OR ({col} = ? AND {alias}.id > ?))", [key, key, last_id]
+    return f" AND ({col} < ? OR ({col} = ? AND {alias}.id < ?))", [key, key, last_id]
+
+
+def order_clause(sort, alias="p", key_sql=None):
+    """ORDER BY for `sort`; `key_sql` orders by a computed key instead of its column alias."""
+    if sort == "relevance":
+        return f" ORDER BY {key_sql or 'relevance'} DESC, {alias}.id DESC"
+    col = f"{alias}.{SORT_KEYS[sort]}"
+    if sort == "endingSoon":
+        return f" ORDER BY {col} ASC, {alias}.id ASC"
+    return f" ORDER BY {col} DESC, {alias}.id DESC"
+
+
+def split_page(rows, limit, sort):
+    """
+    Given up to limit+1 rows, returns (page, next_cursor). The extra row is only
+    used to learn whether another page exists.
+    """
+    if len(rows) > limit:
+        page = rows[:limit]
+        return page, encode_cursor(sort, page[-1])
+    return rows, None
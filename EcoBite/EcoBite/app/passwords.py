@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from flask import current_app
+from werkzeug.security import check_password_hash
+
+
+class PasswordBusy(Exception):
+    """Raised when the hashing queue stayed full for PASSWORD_QUEUE_TIMEOUT."""
+
+
+# --- run in the worker processes -------------------------------------------
+
+_hashers = {}
+
+
+def _hasher(params):
+    """One PasswordHasher per cost setting, kept for the life of the worker."""
+    hasher = _hashers.get(params)
+    if hasher is None:
+        time_cost, memory_cost, parallelism = params
+        hasher = _hashers[params] = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost,
+                                                   parallelism=parallelism)
+    return hasher
+
+
+def _hash(password, params):
+    return _hasher(params).hash(password)
+
+
+def _verify(stored, password, params):
+    """
+    Returns (ok, new_hash). new_hash is set when the password was right but the
+    stored hash is a legacy werkzeug one or argon2 with other costs, so the
+    caller can upgrade it without a second trip to the pool.
+    """
+    hasher = _hasher(params)
+    if stored.startswith("$argon2"):
+        try:
+            hasher.verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False, None
+        return True, (hasher.hash(password) if hasher.check_needs_rehash(stored) else None)
+    try:
+        ok = check_password_hash(stored, password)
+    except ValueError:      # unknown method
+        return False, None
+    return ok, (hasher.hash(password) if ok else None)
+
+
+# --- request side ----------------------------------------------------------
+
+class HashPool:
+    """
+    Runs argon2 in a pool of worker processes so a burst of logins neither
+    blocks the request worker for the whole KDF nor holds the GIL from every
+    other thread. `max_pending` bounds the jobs in flight per web process
+    (running plus queued); a request that cannot get a slot within `timeout`
+    gets PasswordBusy instead of queueing without limit.
+
+    workers=0 hashes inline, which is what tests and single-threaded dev
+    servers want.
+    """
+
+    def __init__(self, params, workers=2, max_pending=8, timeout=5.0):
+        self.params = params
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._counters = {"hashes": 0, "verifies": 0, "rehashes": 0, "busy": 0,
+                          "wait_seconds": 0.0, "hash_seconds": 0.0}
+
+    def _run(self, func, *args):
+        started = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self._counters["busy"] += 1
+            raise PasswordBusy(f"Password hashing queue full for {self.timeout}s")
+        queued = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+            self._counters["wait_seconds"] += queued - started
+        try:
+            if self._executor is None:
+                return func(*args, self.params)
+            return self._executor.submit(func, *args, self.params).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._counters["hash_seconds"] += time.monotonic() - queued
+            self._slots.release()
+
+    def hash(self, password):
+        with self._lock:
+            self._counters["hashes"] += 1
+        return self._run(_hash, password)
+
+    def verify(self, stored, password):
+        """(ok, new_hash); see _verify."""
+        with self._lock:
+            self._counters["verifies"] += 1
+        ok, new_hash = self._run(_verify, stored, password)
+        if new_hash:
+            with self._lock:
+                self._counters["rehashes"] += 1
+        return ok, new_hash
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                **self._counters,
+            }
+
+
+def get_hash_pool(app=None):
+    """This process's HashPool, created lazily (and again after fork)."""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('hash_pool')
+    if pool is None or pool.pid != os.getpid():
+        config = app.config
+        pool = HashPool(
+            (config['ARGON2_TIME_COST'], config['ARGON2_MEMORY_COST'], config['ARGON2_PARALLELISM']),
+            workers=config['PASSWORD_WORKERS'],
+            max_pending=config['PASSWORD_MAX_PENDING'],
+            timeout=config['PASSWORD_QUEUE_TIMEOUT'],
+        )
+        app.extensions['hash_pool'] = pool
+    return pool
+
+
+def hash_password(password):
+    return get_hash_pool().hash(password)
+
+
+def verify_password(stored, password):
+    """(ok, new_hash): new_hash, when set, should replace `stored` (see _verify)."""
+    return get_hash_pool().verify(stored, password)
@@ -0,0 +1,34 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+_QUANTITY = re.compile(r"^\s*(\d+(?:[.,]\d+)?)\s*(.*?)\s*$")
+
+# quantity_amount is DECIMAL(10,2)
+MAX_AMOUNT = Decimal("99999999.99")
+
+
+def parse_quantity(text):
+    """
+    Splits free-text quantities like "5", "2.5 kg" or "3 trays" into
+    (amount, unit). Returns (None, None) when there is no leading number.
+    """
+    if text is None:
+        return None, None
+    match = _QUANTITY.match(str(text))
+    if not match:
+        return None, None
+    try:
+        amount = Decimal(match.group(1).replace(",", ".")).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None, None
+    if amount > MAX_AMOUNT:
+        return None, None
+    return amount, match.group(2)[:32] or None
+
+
+def format_quantity(amount, unit=None):
+    """Inverse of parse_quantity for display: (Decimal("2.50"), "kg") -> "2.5 kg"."""
+    if amount is None:
+        return None
+    text = format(Decimal(amount).normalize(), "f")
+    return f"{text} {unit}" if unit else text
@@ -0,0 +1,132 @@
+from collections.abc import Mapping
+
+from flask.json.provider import DefaultJSONProvider
+
+
+class Row:
+    """
+    Read-mostly result row backed by the driver's tuple. All rows of one
+    result share a single {column: position} index, so a row costs one small
+    object instead of a dict. Supports row["col"], row.col (and so Jinja's
+    post.title), get(), keys()/items(), dict(row) and JSON via RowJSONProvider.
+
+    Assigning an existing column copies the values into a list; assigning a
+    new key (e.g. post["claims"] = ...) goes to a per-row overflow dict.
+    """
+
+    __slots__ = ("_index", "_values", "_extra")
+
+    def __init__(self, index, values, extra=None):
+        self._index = index
+        self._values = values
+        self._extra = extra
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._index[key]]
+        except KeyError:
+            if self._extra is not None and key in self._extra:
+                return self._extra[key]
+            raise
+
+    def __getattr__(self, name):
+        # Only reached for names that are not slots or methods.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setitem__(self, key, value):
+        i = self._index.get(key)
+        if i is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        if type(self._values) is not list:
+            self._values = list(self._values)
+        self._values[i] = value
+
+    def __contains__(self, key):
+        return key in self._index or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from self._index
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self._index) + (len(self._extra) if self._extra is not None else 0)
+
+    def __eq__(self, other):
+        if isinstance(other, (Row, Mapping)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Row({self.to_dict()!r})"
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+    def copy(self):
+        """Shallow copy sharing the column index; cheap enough to hand out from caches."""
+        return Row(self._index, self._values, dict(self._extra) if self._extra is not None else None)
+
+    def to_dict(self):
+        d = {col: self._values[i] for col, i in self._index.items()}
+        if self._extra is not None:
+            d.update(self._extra)
+        return d
+
+
+Mapping.register(Row)
+
+
+def column_index(desc):
+    """{column name: position} from a cursor description; a repeated name keeps its last position, like dict_rows."""
+    return {d[0]: i for i, d in enumerate(desc)}
+
+
+def rows(fetched, desc):
+    """
+    Wraps fetched tuples as Rows sharing one column index. Drop-in for
+    dict_rows wherever the result is only read, rendered or serialized.
+    """
+    index = column_index(desc)
+    return [Row(index, r) for r in fetched]
+
+
+def without(result, *columns):
+    """
+    Rows of one result minus `columns` (e.g. a sort key only needed for the
+    cursor), sharing a narrower index; the values are not copied.
+    """
+    if not result:
+        return result
+    index = {col: i for col, i in result[0]._index.items() if col not in columns}
+    return [Row(index, r._values, r._extra) for r in result]
+
+
+class RowJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, taught to serialize Row objects."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Row):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
@@ -0,0 +1,118 @@
+import threading
+import time
+from functools import wraps
+
+import click
+import mariadb
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.db import connect_args
+
+
+def _in_app_context(app, func):
+    """Runs a job inside an app context so it can use the pooled DB helpers."""
+    @wraps(func)
+    def job():
+        with app.app_context():
+            func()
+    return job
+
+
+class SchedulerLeader:
+    """
+    Lets exactly one process run the scheduled jobs. Every web worker starts
+    its scheduler paused and competes for a MariaDB named lock (GET_LOCK) on
+    a connection of its own; only the holder resumes its scheduler. The lock
+    belongs to that connection, so when the leader exits or loses the
+    database the lock is freed and another process takes over within
+    `retry` seconds. Works across hosts sharing the database, too.
+    """
+
+    def __init__(self, app, scheduler, retry=30):
+        self.app = app
+        self.scheduler = scheduler
+        self.retry = retry
+        self.lock_name = f"{app.config['DB_NAME']}.scheduler"
+        self.leading = False
+        self._conn = None
+        self._thread = threading.Thread(target=self._run, name="scheduler-leader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._check()
+            except mariadb.Error as e:
+                self._step_down(f"lost the database: {e}")
+            time.sleep(self.retry)
+
+    def _check(self):
+        if self._conn is None:
+            self._conn = mariadb.connect(**connect_args(self.app.config))
+        if self.leading:
+            self._conn.ping()
+            return
+        cur = self._conn.cursor()
+        try:
+            cur.execute("SELECT GET_LOCK(?, 0)", (self.lock_name,))
+            acquired = cur.fetchone()[0] == 1
+        finally:
+            cur.close()
+        if acquired:
+            self.leading = True
+            self.scheduler.resume()
+            print("✅ This process now runs the scheduled jobs")
+
+    def _step_down(self, reason):
+        if self.leading:
+            self.scheduler.pause()
+            self.leading = False
+            print(f"❌ Scheduler paused, {reason}")
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except mariadb.Error:
+                pass
+            self._conn = None
+
+
+def _cli_command():
+    """Name of the `flask` command loading the app, or None outside the CLI."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return None
+    return ctx.command.name
+
+
+def init_app(app):
+    """
+    Starts the background scheduler for periodic maintenance jobs, paused
+    until this process wins the SchedulerLeader election. Disabled under
+    TESTING, when SCHEDULER_ENABLED is off, and in `flask` CLI commands
+    other than `flask run` (maintenance commands are one-shot processes).
+    """
+    if app.config.get('TESTING') or not app.config['SCHEDULER_ENABLED']:
+        return None
+    command = _cli_command()
+    if command is not None and command != "run":
+        return None
+
+    from app.counters import reconcile_job
+    from app.expiry import sweep_job
+    from app.events import prune_job
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(_in_app_context(app, reconcile_job), "interval",
+                      seconds=app.config['STATS_RECONCILE_INTERVAL'],
+                      id="reconcile_stats", max_instances=1, coalesce=True)
+    scheduler.add_job(_in_app_context(app, sweep_job), "interval",
+                      seconds=app.config['EXPIRY_SWEEP_INTERVAL'],
+                      id="sweep_expired", max_instances=1, coalesce=True)
+    scheduler.add_job(_in_app_context(app, prune_job), "interval", hours=1,
+                      id="prune_events", max_instances=1, coalesce=True)
+    scheduler.start(paused=True)
+    SchedulerLeader(app, scheduler, retry=app.config['SCHEDULER_LEADER_RETRY']).start()
+    app.extensions['scheduler'] = scheduler
+    return scheduler
@@ -0,0 +1,32 @@
+import re
+
+# Matches InnoDB's defaults (innodb_ft_min_token_size / the built-in stopword
+# table). Terms the index never stores must not be sent as required terms,
+# otherwise a boolean-mode search matches nothing at all.
+MIN_TOKEN_LEN = 3
+STOPWORDS = {
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for",
+    "from", "how", "i", "in", "is", "it", "la", "of", "on", "or", "that", "the",
+    "this", "to", "was", "what", "when", "where", "who", "will", "with", "und",
+    "www",
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+MATCH_SQL = "MATCH(p.title, p.description) AGAINST (? IN BOOLEAN MODE)"
+
+
+def boolean_query(text):
+    """
+    Turns free text into a BOOLEAN MODE query where every word is required and
+    prefix-matched: "veg pizz" -> "+veg* +pizz*". Operators typed by the user
+    are dropped. Returns None when no term is indexable, so callers can fall
+    back to a LIKE scan.
+    """
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if len(word) >= MIN_TOKEN_LEN and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    if not terms:
+        return None
+    return " ".join(f"+{t}*" for t in terms)
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g
+
+from app.db import get_cursor, get_pool
+from app.metrics import cache_lookup
+
+
+class StaleCache:
+    """
+    Last known good results of the public read paths (feed pages, site-wide
+    stats), kept so readers get slightly old data instead of an error or a
+    wait when the database is down or slow.
+
+    Every successful read stores its result. While the circuit breaker is
+    not closed, or loads have recently been slower than `latency_budget`
+    (a moving average), a key that has a stored result is answered from
+    memory straight away and refreshed by a background thread; that
+    thread's timings also tell us when the database is fast again.
+    Results older than `max_age` are never served.
+
+    refresh_workers=0 refreshes inline, which is what tests want.
+    """
+
+    SMOOTHING = 0.3     # weight of the newest load time in the moving average
+
+    def __init__(self, app, max_entries=256, max_age=600, latency_budget=0.5, refresh_workers=1):
+        self.app = app
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.latency_budget = latency_budget
+        self.pid = os.getpid()
+        self._executor = (ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="stale-refresh")
+                          if refresh_workers else None)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, stored at)
+        self._refreshing = set()
+        self.latency = 0.0
+        self._counters = {"loads": 0, "stale_served": 0, "misses": 0,
+                          "refreshes": 0, "refresh_errors": 0}
+
+    def get(self, key):
+        """(value, age in seconds), or None when nothing servable is stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry[1]
+            if age > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], age
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def observe(self, seconds):
+        """Folds one load time into the moving average."""
+        with self._lock:
+            self.latency += self.SMOOTHING * (seconds - self.latency)
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def degraded(self):
+        """True while readers should not wait on the database."""
+        if self.latency_budget and self.latency > self.latency_budget:
+            return True
+        return get_pool(self.app).breaker.state != "closed"
+
+    def refresh(self, key, load, store=True):
+        """
+        Runs load(cursor) off the request path, at most once per key at a
+        time, and stores the result under `key` (unless store=False, for
+        loads that update their own state, like the feed view's rebuild).
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        if self._executor is None:
+            self._refresh(key, load, store)
+        else:
+            self._executor.submit(self._refresh, key, load, store)
+
+    def _refresh(self, key, load, store):
+        try:
+            with self.app.app_context():
+                started = time.monotonic()
+                cur = get_cursor()
+                if cur is None:
+                    return      # still down; the next stale read tries again
+                value = load(cur)
+                self.observe(time.monotonic() - started)
+                if store:
+                    self.put(key, value)
+                self.count("refreshes")
+        except Exception as e:
+            self.count("refresh_errors")
+            print(f"❌ Background refresh of {key!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "refreshing": len(self._refreshing),
+                    "latency_ms": round(self.latency * 1000, 1),
+                    "latency_budget_ms": self.latency_budget * 1000, **self._counters}
+
+
+def get_stale_cache(app=None):
+    """This process's StaleCache, created lazily (and again after fork)."""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('stale_cache')
+    if cache is None or cache.pid != os.getpid():
+        config = app.config
+        cache = StaleCache(app,
+                           max_entries=config['STALE_CACHE_MAX_ENTRIES'],
+                           max_age=config['STALE_CACHE_MAX_AGE'],
+                           latency_budget=config['STALE_CACHE_LATENCY_BUDGET'],
+                           refresh_workers=config['STALE_CACHE_REFRESH_WORKERS'])
+        app.extensions['stale_cache'] = cache
+    return cache
+
+
+def note_stale(age):
+    """Marks the current response as (partly) served from old data."""
+    g.stale_age = max(g.get('stale_age', 0.0), age)
+
+
+def read_through(key, load):
+    """
+    Returns load(cursor) for a public read, falling back to the last known
+    good result for `key` when the database is degraded, unavailable or
+    fails. Returns None when there is neither a database nor a stored
+    result; load errors propagate in that case too.
+    """
+    if not current_app.config['STALE_CACHE_ENABLED']:
+        cur = get_cursor()
+        return load(cur) if cur is not None else None
+
+    cache = get_stale_cache()
+    stored = cache.get(key)
+
+    def serve_stored():
+        cache.count("stale_served")
+        cache_lookup("last_known_good", "stale")
+        cache.refresh(key, load)
+        note_stale(stored[1])
+        return stored[0]
+
+    if stored is not None and cache.degraded():
+        return serve_stored()
+    started = time.monotonic()
+    cur = get_cursor()
+    if cur is None:
+        if stored is not None:
+            return serve_stored()
+        cache.count("misses")
+        cache_lookup("last_known_good", "miss")
+        return None
+    try:
+        value = load(cur)
+    except Exception as e:
+        if stored is None:
+            raise
+        print(f"❌ Read of {key!r} failed, serving last known good: {e}")
+        return serve_stored()
+    cache.observe(time.monotonic() - started)
+    cache.put(key, value)
+    cache.count("loads")
+    cache_lookup("last_known_good", "fresh")
+    return value
+
+
+def _stale_headers(response):
+    age = g.pop('stale_age', None)
+    if age is not None:
+        response.headers["Age"] = str(int(age))
+        response.headers["Warning"] = '110 - "Response is Stale"'
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def init_app(app):
+    """
+    Adds Age / Warning: 110 to responses built from last known good data
+    (see read_through); the cache itself is created on first use.
+    """
+    app.after_request(_stale_headers)
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadRejected(ValueError):
+    """The upload's file type is not accepted."""
+
+
+class Storage(ABC):
+    """
+    Where uploaded files live. Keys are relative, '/'-separated names such as
+    "3f/3fa2...c1.jpg"; backends map them to a location and a public URL.
+
+    put() is how a finished local file enters storage. Content-addressed keys
+    make it idempotent, so an existing key is kept unless `replace` is set.
+    """
+
+    @abstractmethod
+    def put(self, key, src_path, replace=False):
+        """Moves `src_path` in under `key`. Returns False if the key already existed and was kept."""
+
+    @abstractmethod
+    def exists(self, key):
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def keys(self):
+        """Yields (key, modified unix time) for everything stored."""
+
+    @abstractmethod
+    def url(self, key):
+        pass
+
+    @abstractmethod
+    def key_for_url(self, url):
+        """Inverse of url(); None for URLs this backend does not serve."""
+
+    @abstractmethod
+    def local_path(self, key):
+        """A readable local file with the key's content (remote backends would download it)."""
+
+    def temp_dir(self):
+        """Directory for files being written before put(), ideally on the same filesystem."""
+        return tempfile.gettempdir()
+
+
+class LocalStorage(Storage):
+    """Files under `root` (normally static/uploads), served by Flask's static route at `base_url`."""
+
+    TMP_DIR = ".tmp"
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key):
+        path = os.path.normpath(os.path.join(self.root, *key.split("/")))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def put(self, key, src_path, replace=False):
+        path = self._path(key)
+        if not replace and os.path.exists(path):
+            os.remove(src_path)
+            # A repeat upload revives the file: the GC grace period counts from now.
+            os.utime(path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(src_path, path)
+        return True
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def keys(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d != self.TMP_DIR]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                try:
+                    yield key, os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+
+    def url(self, key):
+        return f"{self.base_url}/{key}"
+
+    def key_for_url(self, url):
+        if url and url.startswith(self.base_url + "/"):
+            return url[len(self.base_url) + 1:]
+        return None
+
+    def local_path(self, key):
+        return self._path(key)
+
+    def temp_dir(self):
+        path = os.path.join(self.root, self.TMP_DIR)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+
+def save_upload(file, storage, allowed_exts):
+    """
+    Streams a werkzeug FileStorage into `storage` under the SHA-256 of its
+    bytes, hashed while they are copied to a temp file, so the upload is
+    never held in memory whole. The same photo uploaded twice maps to the
+    same key and is stored once. Returns the key; raises UploadRejected for
+    a disallowed extension.
+    """
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in allowed_exts:
+        raise UploadRejected(f"Unsupported file type {ext or '(none)'}; use {', '.join(allowed_exts)}")
+    if ext == ".jpeg":
+        ext = ".jpg"
+    digest = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=storage.temp_dir(), suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        name = digest.hexdigest()
+        key = f"{name[:2]}/{name}{ext}"
+        storage.put(key, tmp)
+        return key
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def collect_garbage(storage, referenced, grace_seconds=86400, dry_run=False):
+    """
+    Deletes stored files whose key is not in `referenced` and that are older
+    than `grace_seconds`. The grace period keeps files saved for a post that
+    has not been committed yet. Returns (deleted keys, bytes freed).
+    """
+    cutoff = time.time() - grace_seconds
+    deleted, freed = [], 0
+    for key, modified in storage.keys():
+        if key in referenced or modified > cutoff:
+            continue
+        path = storage.local_path(key)
+        try:
+            freed += os.path.getsize(path)
+        except OSError:
+            pass
+        if not dry_run:
+            storage.delete(key)
+        deleted.append(key)
+    return deleted, freed
+
+
+def referenced_keys(cur, storage):
+    """Keys of every file a post still points at."""
+    cur.execute("SELECT image_url, image_thumb_url, image_card_url FROM posts "
+                "WHERE image_url IS NOT NULL OR image_thumb_url IS NOT NULL OR image_card_url IS NOT NULL")
+    keys = set()
+    for urls in cur.fetchall():
+        keys.update(k for k in map(storage.key_for_url, urls) if k)
+    return keys
+
+
+def get_storage():
+    """The configured upload storage backend."""
+    app = current_app._get_current_object()
+    storage = app.extensions.get('storage')
+    if storage is None:
+        backend = app.config['STORAGE_BACKEND']
+        if backend != "local":
+            raise RuntimeError(f"Unknown STORAGE_BACKEND: {backend}")
+        storage = LocalStorage(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_URL'])
+        app.extensions['storage'] = storage
+    return storage
@@ -0,0 +1,85 @@
+import zlib
+
+import brotli
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON = "application/x-ndjson"
+CHUNK_ROWS = 500
+
+
+def stream_format():
+    """
+    The streaming mode the client asked for: "ndjson" (Accept: application/x-ndjson
+    or ?format=ndjson), "json" (?stream=1, a regular JSON array), or None.
+    """
+    if request.args.get("format") == "ndjson" or request.accept_mimetypes.best == NDJSON:
+        return "ndjson"
+    if request.args.get("stream") == "1":
+        return "json"
+    return None
+
+
+def _encoder():
+    """Picks br or gzip from Accept-Encoding; returns (name, compress, flush, finish) or None."""
+    accepted = request.accept_encodings
+    if accepted["br"]:
+        c = brotli.Compressor(quality=5)
+        return "br", c.process, c.flush, c.finish
+    if accepted["gzip"]:
+        c = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return "gzip", c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+    return None
+
+
+def _encode_rows(cur, fmt, chunk_rows):
+    dumps = current_app.json.dumps
+    cols = [d[0] for d in cur.description]
+    first = True
+    if fmt == "json":
+        yield b"["
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        parts = []
+        for row in rows:
+            item = dict(zip(cols, row))
+            if fmt == "ndjson":
+                parts.append(dumps(item) + "\n")
+            else:
+                parts.append(("" if first else ",") + dumps(item))
+            first = False
+        yield "".join(parts).encode()
+    if fmt == "json":
+        yield b"]"
+
+
+def stream_rows(cur, fmt="json", chunk_rows=CHUNK_ROWS):
+    """
+    Streams the rows of an executed query as a JSON array or NDJSON, reading
+    `chunk_rows` at a time so memory stays flat however many rows there are.
+    `cur` should be unbuffered (see app.db.get_stream_cursor); it is closed once
+    the last row is sent. The body is compressed with br or gzip when accepted.
+    """
+    encoder = _encoder()
+
+    def generate():
+        try:
+            if encoder is None:
+                yield from _encode_rows(cur, fmt, chunk_rows)
+                return
+            _, compress, flush, finish = encoder
+            for chunk in _encode_rows(cur, fmt, chunk_rows):
+                # Flush per chunk so clients see rows as they are produced.
+                yield compress(chunk) + flush()
+            yield finish()
+        finally:
+            cur.close()
+
+    resp = Response(stream_with_context(generate()),
+                    mimetype=NDJSON if fmt == "ndjson" else "application/json")
+    resp.headers["Vary"] = "Accept, Accept-Encoding"
+    resp.headers["X-Accel-Buffering"] = "no"    # let nginx pass chunks straight through
+    if encoder is not None:
+        resp.headers["Content-Encoding"] = encoder[0]
+    return resp
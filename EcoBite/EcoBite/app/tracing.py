@@ -0,0 +1,194 @@
+import re
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import g, current_app, request
+
+# Statements worth asking the optimizer about; EXPLAIN of anything else is an error.
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+SLOWEST_KEPT = 5
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a request runs more statements than its query budget allows.
+    Views catching Exception may swallow it, so the trace remembers it and
+    _finish_trace raises it again once the view returns.
+    """
+
+
+def statement_shape(sql):
+    """Whitespace- and IN-list-insensitive form of a statement, used to spot N+1 loops."""
+    return _IN_LIST.sub("(?)", " ".join(sql.split()))
+
+
+class RequestTrace:
+    """Statements executed while serving one request."""
+
+    def __init__(self, budget=0):
+        self.budget = budget
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []           # [(seconds, sql, params)], longest first
+        self.shapes = Counter()
+        self.repeated = set()       # shapes already reported as N+1 suspects
+        self.exceeded = None        # QueryBudgetExceeded message, once raised
+
+    def record(self, sql, params, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.shapes[statement_shape(sql)] += 1
+        if len(self.slowest) < SLOWEST_KEPT or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, sql, params))
+            self.slowest.sort(key=lambda s: s[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+
+class TracingCursor:
+    """
+    Wraps a driver cursor so execute/executemany are timed into the current
+    request's trace. Everything else (fetch*, description, rowcount,
+    lastrowid, ...) is passed straight through.
+    """
+
+    def __init__(self, cursor, conn, trace, explain=True):
+        self._cursor = cursor
+        self._conn = conn
+        self._trace = trace
+        self._explain = explain
+
+    def execute(self, sql, *args, **kwargs):
+        return self._run(self._cursor.execute, sql, args, kwargs, explain=self._explain)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._run(self._cursor.executemany, sql, args, kwargs, explain=False)
+
+    def _run(self, method, sql, args, kwargs, explain=True):
+        trace = self._trace
+        if trace.budget and trace.count >= trace.budget:
+            _over_budget(trace, sql)
+        params = args[0] if args else kwargs.get("data", ())
+        start = time.perf_counter()
+        try:
+            return method(sql, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            trace.record(sql, params, elapsed)
+            shape = statement_shape(sql)
+            if trace.shapes[shape] == current_app.config['SQL_N_PLUS_ONE_THRESHOLD']:
+                trace.repeated.add(shape)
+            if elapsed * 1000 >= current_app.config['SQL_SLOW_QUERY_MS']:
+                _log_slow(self._conn, sql, params, elapsed, explain)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+def traced(cursor, conn, explain=True):
+    """
+    Wraps `cursor` for the current request's trace; a no-op outside traced
+    requests. Pass explain=False for unbuffered cursors, whose pending result
+    set would make the slow-query EXPLAIN fail.
+    """
+    trace = g.get('sql_trace')
+    if trace is None:
+        return cursor
+    return TracingCursor(cursor, conn, trace, explain)
+
+
+def current_trace():
+    return g.get('sql_trace')
+
+
+def query_budget(limit):
+    """
+    View decorator overriding SQL_QUERY_BUDGET for one endpoint, e.g.
+    @query_budget(3) on a view that must not grow an N+1 loop.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            trace = current_trace()
+            if trace is not None:
+                trace.budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _over_budget(trace, sql):
+    message = (f"{request.method} {request.path} exceeded its query budget of "
+               f"{trace.budget} statements at: {statement_shape(sql)[:200]}")
+    if current_app.testing or current_app.config['SQL_QUERY_BUDGET_ENFORCE']:
+        trace.exceeded = trace.exceeded or message
+        raise QueryBudgetExceeded(message)
+    if trace.count == trace.budget:
+        current_app.logger.warning(message)
+
+
+def _log_slow(conn, sql, params, elapsed, explain):
+    plan = None
+    if explain and sql.lstrip().upper().startswith(EXPLAINABLE):
+        # A separate, untraced cursor so EXPLAIN neither counts against the
+        # budget nor disturbs the caller's result set.
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("EXPLAIN " + sql, params)
+                cols = [d[0] for d in cur.description]
+                plan = [dict(zip(cols, row)) for row in cur.fetchall()]
+            finally:
+                cur.close()
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+    current_app.logger.warning(
+        "Slow query (%.1f ms) in %s %s: %s\n  params=%r\n  plan=%s",
+        elapsed * 1000, request.method, request.path, " ".join(sql.split()), params, plan)
+
+
+def _start_trace():
+    g.sql_trace = RequestTrace(current_app.config['SQL_QUERY_BUDGET'])
+
+
+def _finish_trace(response):
+    trace = g.get('sql_trace')
+    if trace is None:
+        return response
+    if trace.exceeded:
+        # The view caught the error and answered anyway; fail the request.
+        message, trace.exceeded = trace.exceeded, None
+        raise QueryBudgetExceeded(message)
+    response.headers.add("Server-Timing", f'db;dur={trace.total * 1000:.1f};desc="{trace.count} queries"')
+    for shape in trace.repeated:
+        current_app.logger.warning(
+            "Possible N+1 in %s %s: statement ran %d times: %s",
+            request.method, request.path, trace.shapes[shape], shape[:200])
+    if trace.count:
+        current_app.logger.debug(
+            "%s %s: %d queries, %.1f ms; slowest %s", request.method, request.path,
+            trace.count, trace.total * 1000,
+            ", ".join(f"{s * 1000:.1f} ms {' '.join(q.split())[:80]}" for s, q, _ in trace.slowest[:3]))
+    return response
+
+
+def init_app(app):
+    """
+    Per-request SQL tracing: query count and DB time (Server-Timing header),
+    slow-statement log with EXPLAIN, N+1 warnings and an optional query budget.
+    """
+    if not app.config['SQL_TRACE_ENABLED']:
+        return
+    app.before_request(_start_trace)
+    app.after_request(_finish_trace)
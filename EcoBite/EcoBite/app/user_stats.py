@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app.db import get_cursor
+from app.expiry import available_condition
+from app.metrics import cache_lookup
+
+# One round trip for everything /api/stats/me and compute_stats(user_id) need.
+# Both derived tables are ungrouped aggregates, so they always yield one row.
+USER_STATS_SQL = """
+    SELECT u.created_at,
+           COALESCE(ps.created, 0), COALESCE(ps.shared, 0), COALESCE(ps.claimed, 0),
+           COALESCE(ps.weight, 0), COALESCE(ps.available, 0),
+           COALESCE(cs.made, 0), COALESCE(cs.accepted, 0), COALESCE(cs.rejected, 0)
+    FROM users u
+    JOIN (
+        SELECT COUNT(*) AS created,
+               SUM(status IN ('claimed', 'completed')) AS shared,
+               SUM(status = 'claimed') AS claimed,
+               SUM(CASE WHEN status IN ('claimed', 'completed') THEN estimated_weight_kg END) AS weight,
+               SUM({available}) AS available
+        FROM posts WHERE user_id = ?
+    ) ps
+    JOIN (
+        SELECT COUNT(*) AS made,
+               SUM(status = 'approved') AS accepted,
+               SUM(status = 'rejected') AS rejected
+        FROM claims WHERE claimer_id = ?
+    ) cs
+    WHERE u.id = ?
+"""
+
+FIELDS = ("posts_created", "posts_shared", "posts_claimed", "weight_shared_kg",
+          "posts_available", "claims_made", "claims_accepted", "claims_rejected")
+
+
+class UserStatsCache:
+    """
+    Per-process LRU of per-user stats snapshots with a TTL. Writers invalidate
+    the users they touch; the TTL bounds staleness for writes made by other
+    worker processes.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # user_id -> (expires_at, snapshot)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(entry[1])
+
+    def put(self, user_id, snapshot):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(snapshot))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+
+def _cache():
+    cache = current_app.extensions.get('user_stats_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'user_stats_cache', UserStatsCache(current_app.config['USER_STATS_TTL']))
+    return cache
+
+
+def load_user_stats(cur, user_id):
+    cur.execute(USER_STATS_SQL.format(available=available_condition(alias=None)), (user_id, user_id, user_id))
+    row = cur.fetchone()
+    snapshot = dict.fromkeys(FIELDS, 0)
+    snapshot["join_date"] = None
+    if row:
+        snapshot["join_date"] = row[0]
+        snapshot.update(zip(FIELDS, row[1:]))
+    for field in FIELDS:
+        snapshot[field] = float(snapshot[field]) if field == "weight_shared_kg" else int(snapshot[field])
+    return snapshot
+
+
+def get_user_stats(user_id):
+    """
+    Cached stats snapshot for one user, or None if the database is unavailable.
+    """
+    cache = _cache()
+    snapshot = cache.get(user_id)
+    if snapshot is not None:
+        cache_lookup("user_stats", "hit")
+        return snapshot
+    cache_lookup("user_stats", "miss")
+    cur = get_cursor()
+    if cur is None:
+        return None
+    snapshot = load_user_stats(cur, user_id)
+    cache.put(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_user_stats(*user_ids):
+    """Drop cached snapshots after a committed write that affects these users."""
+    cache = current_app.extensions.get('user_stats_cache')
+    if cache is not None:
+        cache.invalidate(*user_ids)
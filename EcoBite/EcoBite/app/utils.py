@@ -1,5 +1,9 @@
 from flask import session, flash, redirect, url_for
 from app.db import get_cursor
+from app.counters import read_counters
+from app.expiry import available_condition
+from app.user_stats import get_user_stats
+from app.stale import read_through
 
 def require_login():
     """
@@ -27,29 +31,48 @@ def co2_estimate(shared_count):
     """Estimate CO2 saved.""" 
     return int(shared_count * 1.5)
 
+def available_count(user_id=None):
+    """
+    Number of active, unexpired posts. Answered from the in-memory feed view
+    when it is enabled, otherwise with a COUNT query.
+    """
+    from app.feed_cache import get_feed
+    feed = get_feed()
+    if feed is not None:
+        return feed.count(user_id)
+    cur = get_cursor()
+    if cur is None:
+        return 0
+    q = "SELECT COUNT(*) FROM posts WHERE " + available_condition(alias=None)
+    cur.execute(q + (" AND user_id=?" if user_id else ""), (user_id,) if user_id else ())
+    return cur.fetchone()[0]
+
 def compute_stats(user_id=None):
     """
     Compute stats for homepage or profile.
+    Site-wide stats come from the maintained counters (see app.counters),
+    falling back to the last known good values (see app.stale); per-user
+    stats from a cached snapshot (see app.user_stats).
     """
     stats = {"available": 0, "shared": 0, "total": 0, "co2": 0}
-    cur = get_cursor()
-    if cur is None:
+    if not user_id:
+        def load(cur):
+            counters = read_counters(cur)
+            shared = int(counters["claimed_posts"])
+            return {"available": available_count(), "shared": shared,
+                    "total": int(counters["total_posts"]), "co2": co2_estimate(shared)}
+        try:
+            stats.update(read_through("site_stats", load) or {})
+        except Exception as e:
+            print("❌ Stats error:", e)
         return stats
     try:
-        # available
-        q = """
-            SELECT COUNT(*) FROM posts
-            WHERE status='active' AND (expires_at IS NULL OR expires_at > NOW())
-        """
-        cur.execute(q + (" AND user_id=?" if user_id else ""), (user_id,) if user_id else ())
-        stats["available"] = cur.fetchone()[0]
-        # shared
-        cur.execute("SELECT COUNT(*) FROM posts WHERE status='claimed'" + (" AND user_id=?" if user_id else ""), (user_id,) if user_id else ())
-        stats["shared"] = cur.fetchone()[0]
-        # total
-        cur.execute("SELECT COUNT(*) FROM posts" + (" WHERE user_id=?" if user_id else ""), (user_id,) if user_id else ())
-        stats["total"] = cur.fetchone()[0]
-        stats["co2"] = co2_estimate(stats["shared"])
+        snapshot = get_user_stats(user_id)
+        if snapshot:
+            stats["available"] = snapshot["posts_available"]
+            stats["shared"] = snapshot["posts_claimed"]
+            stats["total"] = snapshot["posts_created"]
+            stats["co2"] = co2_estimate(stats["shared"])
     except Exception as e:
         print("❌ Stats error:", e)
     return stats
@@ -0,0 +1,86 @@
+"""
+Microbenchmark: app.utils.dict_rows vs app.rows.rows on feed-shaped results.
+
+    python bench_rows.py [--sizes 1000 10000 100000] [--repeat 5]
+
+Reports best-of-N time to build the result, to read three fields from every
+row, and to serialize it with the app's JSON provider, plus the memory the
+built result holds. No database is needed.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from app.rows import rows, RowJSONProvider
+from app.utils import dict_rows
+
+COLUMNS = ("id", "user_id", "title", "description", "category", "quantity",
+           "estimated_weight_kg", "dietary_json", "location", "expiry_minutes",
+           "pickup_window_start", "pickup_window_end", "expires_at", "status",
+           "image_url", "created_at", "owner_email")
+DESCRIPTION = [(c, None, None, None, None, None, True) for c in COLUMNS]
+
+
+def fake_rows(n):
+    now = datetime(2025, 1, 1, 12, 0)
+    return [
+        (i, i % 97, f"Post {i}", "Leftover trays from the event, still warm", "Meals", "3",
+         1.5, '["vegan"]', "Student Union", 60, None, None, now + timedelta(minutes=i % 600),
+         "active", None, now - timedelta(minutes=i), f"user{i % 97}@campus.edu")
+        for i in range(n)
+    ]
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def retained(fn):
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def read_fields(result):
+    for r in result:
+        r["id"], r["title"], r["expires_at"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.json = RowJSONProvider(app)
+    dumps = app.json.dumps
+    print(f"{'rows':>8} {'impl':>9} {'build ms':>9} {'read ms':>8} {'json ms':>8} {'memory MB':>10}")
+    for n in args.sizes:
+        fetched = fake_rows(n)
+        for name, build in (("dict_rows", dict_rows), ("rows", rows)):
+            result = build(fetched, DESCRIPTION)
+            t_build = best(lambda: build(fetched, DESCRIPTION), args.repeat)
+            t_read = best(lambda: read_fields(result), args.repeat)
+            t_json = best(lambda: dumps(result), args.repeat)
+            mem = retained(lambda: build(fetched, DESCRIPTION))
+            print(f"{n:>8} {name:>9} {t_build * 1000:>9.1f} {t_read * 1000:>8.1f} "
+                  f"{t_json * 1000:>8.1f} {mem / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Picked up automatically by `gunicorn` run from this directory.
+from app.metrics import child_exit  # noqa: F401  (drops an exited worker's live gauges)
@@ -1,8 +1,12 @@
+import argparse
+import os
+import sys
 
 import mariadb
-import os
 from dotenv import load_dotenv
 
+from app.migrations import MaintenanceRequired, upgrade, status, verify
+
 load_dotenv()
 
 DB_USER = os.getenv("DB_USER", "ecobite")
@@ -11,67 +15,85 @@ DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
 DB_PORT = int(os.getenv("DB_PORT", "3306"))
 DB_NAME = os.getenv("DB_NAME", "ecobite")
 
-def migrate():
+
+# MariaDB "Unknown database"
+ER_BAD_DB_ERROR = 1049
+
+
+def connect():
+    return mariadb.connect(
+        user=DB_USER, password=DB_PASS,
+        host=DB_HOST, port=DB_PORT,
+        database=DB_NAME
+    )
+
+
+def create_database():
+    """Creates DB_NAME if it is missing. Run once at deploy time, never per request."""
+    conn = mariadb.connect(user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT)
     try:
-        conn = mariadb.connect(
-            user=DB_USER, password=DB_PASS,
-            host=DB_HOST, port=DB_PORT,
-            database=DB_NAME
-        )
-        cursor = conn.cursor()
-        
-        # Add columns to posts
-        print("Migrating posts table...")
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN title VARCHAR(255) DEFAULT NULL")
-            print("Added title to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("title already exists")
-            else: print(f"Error adding title: {e}")
+        cur = conn.cursor()
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{DB_NAME}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
 
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN estimated_weight_kg FLOAT DEFAULT 0")
-            print("Added estimated_weight_kg to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("estimated_weight_kg already exists")
-            else: print(f"Error adding estimated_weight_kg: {e}")
 
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN pickup_window_start DATETIME DEFAULT NULL")
-            print("Added pickup_window_start to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("pickup_window_start already exists")
-            else: print(f"Error adding pickup_window_start: {e}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoBite schema migrations")
+    sub = parser.add_subparsers(dest="command")
+    up = sub.add_parser("upgrade", help="apply pending migrations (default)")
+    up.add_argument("--to", type=int, default=None, help="stop after this version")
+    up.add_argument("--lock-wait-timeout", type=int, default=10,
+                    help="seconds a DDL statement may wait for a metadata lock")
+    up.add_argument("--allow-blocking", action="store_true",
+                    help="run steps that block writes on a populated table (maintenance window)")
+    sub.add_parser("status", help="list applied and pending migrations")
+    sub.add_parser("verify", help="diff the live schema against the expected one")
+    args = parser.parse_args(argv)
 
+    try:
         try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN pickup_window_end DATETIME DEFAULT NULL")
-            print("Added pickup_window_end to posts")
+            conn = connect()
         except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("pickup_window_end already exists")
-            else: print(f"Error adding pickup_window_end: {e}")
+            if e.errno != ER_BAD_DB_ERROR or args.command not in (None, "upgrade"):
+                raise
+            print(f"Creating database {DB_NAME}")
+            create_database()
+            conn = connect()
+    except mariadb.Error as e:
+        print(f"Connection Error: {e}")
+        return 2
 
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN image_url VARCHAR(255) DEFAULT NULL")
-            print("Added image_url to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("image_url already exists")
-            else: print(f"Error adding image_url: {e}")
+    try:
+        if args.command == "status":
+            for version, name, applied in status(conn):
+                print(f"{'✔' if applied else ' '} {version:04d} {name}")
+            return 0
 
-        # Add columns to claims
-        print("Migrating claims table...")
-        try:
-            cursor.execute("ALTER TABLE claims ADD COLUMN requested_quantity VARCHAR(255) DEFAULT NULL")
-            print("Added requested_quantity to claims")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("requested_quantity already exists")
-            else: print(f"Error adding requested_quantity: {e}")
+        if args.command == "verify":
+            problems = verify(conn)
+            for severity, message in problems:
+                print(f"{severity:>7}: {message}")
+            missing = [p for p in problems if p[0] == "missing"]
+            print("Schema OK" if not missing else f"{len(missing)} missing object(s)")
+            return 1 if missing else 0
 
-        conn.commit()
-        conn.close()
-        print("Migration complete!")
-        
+        applied = upgrade(conn, target=getattr(args, "to", None),
+                          lock_wait_timeout=getattr(args, "lock_wait_timeout", 10),
+                          allow_blocking=getattr(args, "allow_blocking", False))
+        print(f"Applied {len(applied)} migration(s)." if applied else "Schema is up to date.")
+        return 0
+    except MaintenanceRequired as e:
+        print(f"Maintenance Required: {e}")
+        return 1
     except mariadb.Error as e:
-        print(f"Connection Error: {e}")
+        print(f"Migration Error: {e}")
+        return 1
+    finally:
+        conn.close()
+
 
 if __name__ == "__main__":
-    migrate()
+    sys.exit(main())
@@ -16,12 +16,39 @@ export function getUser() {
 }
 
 export async function listPosts(params = {}) {
+  const { items } = await listPostsPage(params);
+  return items;
+}
+
+// One page of the feed. Pass the returned nextCursor back as `cursor` to get the
+// following page; it is null once the last page has been reached.
+export async function listPostsPage(params = {}) {
   const query = new URLSearchParams(params).toString();
   const res = await fetch(`${API_BASE}/food-posts?${query}`);
   if (!res.ok) throw new Error('Failed to fetch posts');
+  return { items: await res.json(), nextCursor: res.headers.get('X-Next-Cursor') };
+}
+
+// Changes to the available feed since `token` (omit it to get a starting token):
+// { changed: [posts to add or update], removed: [ids], more, token }. Pass the
+// returned token to the next call; call again straight away while `more` is true.
+export async function postChanges(token) {
+  const query = token ? `?since=${encodeURIComponent(token)}` : '';
+  const res = await fetch(`${API_BASE}/food-posts/changes${query}`);
+  if (!res.ok) throw new Error('Failed to fetch changes');
   return await res.json();
 }
 
+// Live claim and post updates for the current user (server-sent events).
+// `onEvent(type, data)` gets claim.created, claim.decided, claim.cancelled and
+// post.status; the browser reconnects and resumes after the last event by itself.
+const EVENT_TYPES = ['claim.created', 'claim.decided', 'claim.cancelled', 'post.status'];
+export function subscribeEvents(onEvent) {
+  const source = new EventSource(`${API_BASE}/events`);
+  EVENT_TYPES.forEach(type => source.addEventListener(type, e => onEvent(type, JSON.parse(e.data))));
+  return source;
+}
+
 export async function createPost(data) {
   const isFormData = data instanceof FormData;
   const headers = isFormData ? {} : { 'Content-Type': 'application/json' };
@@ -72,44 +99,32 @@ export async function rejectClaim(postId, claimId) {
   return await res.json();
 }
 
-export async function computeStats() {
-  // Fetch all posts to compute stats client-side or use a stats endpoint if available.
-  // For now, we'll fetch all posts to match previous behavior.
-  const list = await listPosts({ status: 'available' }); // This only gets available
-  // Actually, to get total stats we might need more data or a dedicated endpoint.
-  // But let's try to get all posts if possible, or just use what we have.
-  // The API listPosts filters by status if provided.
-  // Let's fetch "all" for stats if we want accurate total counts, 
-  // but the UI might only need available for the feed.
-  // However, the stats bar needs "Total Posts", "Successfully Shared".
-
-  // Let's fetch all posts without status filter to compute stats?
-  // The API default status is 'available'. We need to pass something to get all?
-  // The API code: if status_filter == "available" ... elif "claimed" ...
-  // It doesn't seem to have an "all" option easily without modification or multiple requests.
-  // Let's make multiple requests in parallel for now.
-
-  const [availableRes, claimedRes, expiredRes] = await Promise.all([
-    fetch(`${API_BASE}/food-posts?status=available`),
-    fetch(`${API_BASE}/food-posts?status=claimed`),
-    fetch(`${API_BASE}/food-posts?status=expired`)
-  ]);
-
-  const availableList = await availableRes.json();
-  const claimedList = await claimedRes.json();
-  const expiredList = await expiredRes.json();
-
-  const available = availableList.length;
-  const shared = claimedList.length;
-  const expired = expiredList.length;
-  const total = available + shared + expired;
-  const savedKg = (shared * 1.2).toFixed(1);
-
-  // For the feed list, we usually return the one matching the current scope.
-  // But computeStats was returning 'list' which was ALL posts in the LS version.
-  // app.js filters this list client-side.
-  // To minimize refactoring app.js, we can combine them.
-  const allList = [...availableList, ...claimedList, ...expiredList];
+// decisions: [{ id, status: 'accepted' | 'rejected' }]. Resolves with
+// { results, succeeded, failed }; individual claims can fail (e.g. the post
+// ran out) while the rest are applied.
+export async function decideClaims(decisions) {
+  const res = await fetch(`${API_BASE}/claims/decisions`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ decisions })
+  });
+  if (!res.ok) {
+    const err = await res.json();
+    throw new Error(err.error || 'Failed to update claims');
+  }
+  return await res.json();
+}
 
-  return { available, total, shared, savedKg, list: allList };
+export async function computeStats() {
+  // The feed endpoint is paginated, so counting list lengths would only see the
+  // first page. Use the aggregate stats endpoint instead.
+  const res = await fetch(`${API_BASE}/stats/global`);
+  if (!res.ok) throw new Error('Failed to fetch stats');
+  const stats = await res.json();
+  return {
+    available: stats.available_now,
+    total: stats.total_posts,
+    shared: stats.successfully_shared,
+    savedKg: stats.food_waste_prevented_kg.toFixed(1)
+  };
 }
@@ -1,5 +1,5 @@
 
-import { listPosts, createPost, claimPost, approveClaim, rejectClaim, computeStats, getUser } from './api.js';
+import { listPostsPage, postChanges, subscribeEvents, createPost, claimPost, approveClaim, rejectClaim, decideClaims, computeStats, getUser } from './api.js';
 
 /* ---------- Sidebar highlighting + user badge ---------- */
 export function navActivate(key) {
@@ -11,9 +11,11 @@ export function navActivate(key) {
 }
 
 /* ---------- FEED ---------- */
+const FEED_POLL_MS = 15000;
+
 export async function renderFeed() {
   hydrateUserOnSidebar();
-  const state = { scope: 'available' };
+  const state = { scope: 'available', cards: new Map(), syncToken: null };
 
   // tabs
   document.querySelectorAll('.tab').forEach(btn => {
@@ -29,6 +31,7 @@ export async function renderFeed() {
     const el = document.getElementById(id);
     if (el) el.addEventListener('input', draw);
   });
+  document.querySelectorAll('input[name="dietFilter"]').forEach(el => el.addEventListener('change', draw));
 
   // Dietary popup toggle
   const dietBtn = byId('dietBtn');
@@ -45,8 +48,12 @@ export async function renderFeed() {
     if (dietPopup) dietPopup.addEventListener('click', (e) => e.stopPropagation());
   }
 
+  const more = byId('loadMore');
+  if (more) more.addEventListener('click', () => loadPage());
+
   initCustomDropdowns();
   await draw();
+  setInterval(() => { if (!document.hidden) syncChanges(); }, FEED_POLL_MS);
 
 
   async function draw() {
@@ -62,6 +69,64 @@ export async function renderFeed() {
       }
     } catch (e) { console.error("Stats error", e); }
 
+    byId('feed').innerHTML = '';
+    state.count = 0;
+    state.cursor = null;
+    state.cards.clear();
+    // Take the sync token before loading so nothing written meanwhile is missed.
+    state.syncToken = null;
+    if (state.scope === 'available') {
+      try { state.syncToken = (await postChanges()).token; } catch (e) { console.error("Sync error", e); }
+    }
+    await loadPage();
+  }
+
+  // Applies feed changes since the last sync instead of re-downloading the list.
+  async function syncChanges() {
+    if (state.scope !== 'available' || !state.syncToken || state.syncing) return;
+    state.syncing = true;
+    try {
+      // New posts are only placed when their position is obvious: top of an unfiltered newest-first feed.
+      const plain = !val('search') && ['', 'all'].includes((val('type') || 'all').toLowerCase())
+        && (val('sort') || 'newest') === 'newest'
+        && !document.querySelector('input[name="dietFilter"]:checked');
+      let more = true;
+      while (more) {
+        const ch = await postChanges(state.syncToken);
+        ch.removed.forEach(id => {
+          const el = state.cards.get(id);
+          if (el) { el.remove(); state.cards.delete(id); state.count--; }
+        });
+        ch.changed.forEach(p => {
+          const el = state.cards.get(p.id);
+          if (el) { el.replaceWith(feedCard(p)); }
+          else if (plain) { byId('feed').prepend(feedCard(p)); state.count++; }
+        });
+        state.syncToken = ch.token;
+        more = ch.more;
+      }
+      byId('emptyFeed').style.display = state.count ? 'none' : 'block';
+    } catch (e) { console.error("Sync error", e); }
+    finally { state.syncing = false; }
+  }
+
+  function feedCard(p) {
+    // Logic for request button: if not owner and available
+    // API returns owner_email. We check against current user email.
+    const user = getUser();
+    const isOwner = p.owner_email === user.email;
+    const isAvailable = p.status === 'active';
+
+    const el = card(p, {
+      cta: (isAvailable && !isOwner) ? { label: 'Request', click: () => { openClaimModal(p); } } : null,
+      showOwner: true
+    });
+    state.cards.set(p.id, el);
+    return el;
+  }
+
+  // Appends the next page of results to the feed.
+  async function loadPage() {
     const q = (val('search') || '').toLowerCase();
     const type = val('type') || 'all';
     const scope = state.scope;
@@ -74,28 +139,28 @@ export async function renderFeed() {
       type: type,
       sort: sort
     };
+    const diets = [...document.querySelectorAll('input[name="dietFilter"]:checked')].map(el => el.value);
+    if (diets.length) params.dietary = diets.join(',');
+    if (state.cursor) params.cursor = state.cursor;
 
     let items = [];
     try {
-      items = await listPosts(params);
-    } catch (e) { console.error("Feed error", e); }
+      const page = await listPostsPage(params);
+      items = page.items;
+      state.cursor = page.nextCursor;
+    } catch (e) { console.error("Feed error", e); state.cursor = null; }
 
     const feed = byId('feed');
-    feed.innerHTML = '';
     items.forEach(p => {
-      // Logic for request button: if not owner and available
-      // API returns owner_email. We check against current user email.
-      const user = getUser();
-      const isOwner = p.owner_email === user.email;
-      const isAvailable = p.status === 'active';
-
-      feed.appendChild(card(p, {
-        cta: (isAvailable && !isOwner) ? { label: 'Request', click: () => { openClaimModal(p); } } : null,
-        showOwner: true
-      }));
+      // A post synced in at the top may come round again on a later page.
+      if (state.cards.has(p.id)) return;
+      feed.appendChild(feedCard(p));
+      state.count++;
     });
 
-    byId('emptyFeed').style.display = items.length ? 'none' : 'block';
+    byId('emptyFeed').style.display = state.count ? 'none' : 'block';
+    const more = byId('loadMore');
+    if (more) more.style.display = state.cursor ? 'block' : 'none';
   }
 }
 
@@ -224,6 +289,7 @@ function initCustomDropdowns() {
 /* ---------- MY POSTS ---------- */
 export async function renderMyPosts() {
   hydrateUserOnSidebar();
+  liveRefresh(renderMyPosts);
   await fetchAndGroupClaims();
   let list = [];
   try {
@@ -265,7 +331,7 @@ export async function renderMyPosts() {
         <div class="mp-info">
           <div class="mp-main-row">
             <div class="mp-thumb">
-                ${p.image_url ? `<img src="${p.image_url}" style="width:100%;height:100%;object-fit:cover;border-radius:8px;">` : '🍱'}
+                ${p.image_url ? `<img src="${p.image_thumb_url || p.image_url}" loading="lazy" style="width:100%;height:100%;object-fit:cover;border-radius:8px;">` : '🍱'}
             </div>
             <div>
               <h5 class="mp-title">${p.title || p.description || 'Untitled'}</h5>
@@ -342,6 +408,7 @@ async function fetchAndGroupClaims() {
 /* ---------- REQUESTS ---------- */
 export async function renderRequests() {
   hydrateUserOnSidebar();
+  liveRefresh(renderRequests);
   const user = getUser();
 
   // 1. Incoming Requests (For My Posts)
@@ -357,6 +424,14 @@ export async function renderRequests() {
     if (incoming.length === 0) {
       iWrap.innerHTML = '<p class="muted">No incoming requests.</p>';
     } else {
+      const pending = incoming.filter(c => c.status === 'pending');
+      if (pending.length > 1) {
+        const bar = document.createElement('div');
+        bar.className = 'actions';
+        bar.appendChild(btn(`Approve all (${pending.length})`, 'primary', () => decideAll(pending, 'accepted')));
+        bar.appendChild(btn('Reject all', 'ghost', () => decideAll(pending, 'rejected')));
+        iWrap.appendChild(bar);
+      }
       incoming.forEach(c => {
         const p = {
           title: c.post_title,
@@ -423,6 +498,17 @@ export async function renderRequests() {
   window.handleRejectReq = (pid, cid) => rejectClaim(pid, cid).then(() => renderRequests());
 }
 
+async function decideAll(claims, status) {
+  try {
+    const { results, failed } = await decideClaims(claims.map(c => ({ id: c.id, status })));
+    if (failed) {
+      const reasons = results.filter(r => !r.success).map(r => `#${r.id}: ${r.error}`);
+      alert(`${failed} request(s) could not be updated:\n${reasons.join('\n')}`);
+    }
+  } catch (e) { alert(e.message); }
+  renderRequests();
+}
+
 async function cancelClaim(id) {
   if (!confirm("Cancel this request?")) return;
   try {
@@ -490,6 +576,18 @@ export async function renderProfile() {
   } catch (e) { console.error("Profile stats error", e); }
 }
 
+/* ---------- live updates ---------- */
+// Re-renders the page when a claim or post event arrives, once per burst.
+let liveSource = null;
+function liveRefresh(render) {
+  if (liveSource || typeof EventSource === 'undefined') return;
+  let timer = null;
+  liveSource = subscribeEvents(() => {
+    clearTimeout(timer);
+    timer = setTimeout(render, 300);
+  });
+}
+
 /* ---------- small UI helpers ---------- */
 function card(p, opts = {}) {
   const root = tag('div', 'card');
@@ -502,7 +600,13 @@ function card(p, opts = {}) {
     wrapper.style.overflow = 'hidden';
 
     const img = tag('img', 'card-image');
-    img.src = p.image_url;
+    img.src = p.image_thumb_url || p.image_url;
+    img.loading = 'lazy';
+    if (p.image_thumb_url && p.image_card_url) {
+      // Derivatives are at most 400px / 1200px on their longest side.
+      img.srcset = `${p.image_thumb_url} 400w, ${p.image_card_url} 1200w`;
+      img.sizes = '(max-width: 600px) 100vw, 400px';
+    }
     wrapper.appendChild(img);
     root.appendChild(wrapper);
   } else {
@@ -0,0 +1,162 @@
+"""
+Stress test: concurrent approvals against one post with a numeric quantity.
+
+    python stress_claims.py [--amount 20] [--claimers 50] [--each 1] [--threads 16]
+
+Creates a post with `--amount` units and `--claimers` pending claims of
+`--each` units, then approves them all at once from `--threads` connections
+through app.claim_decisions.decide_claim. Checks that every approval was
+decremented exactly once (no lost updates), that nothing was over-allocated
+and that the post flipped to 'claimed' when it ran out. Needs the database
+from .env, migrated to the latest version; everything created is removed
+afterwards and the stats counters are reconciled.
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+import mariadb
+
+from app.claim_decisions import decide_claim, ClaimDecisionError
+from app.counters import reconcile
+from migrate_db import connect
+
+EMAIL = "stress-claims-{}@example.invalid"
+
+
+def setup(conn, amount, claimers, each):
+    cur = conn.cursor()
+    user_ids = []
+    for i in range(claimers + 1):
+        cur.execute("INSERT INTO users (email, password_hash, role) VALUES (?, '!', 'user')",
+                    (EMAIL.format(f"{time.time_ns()}-{i}"),))
+        user_ids.append(cur.lastrowid)
+    owner, claimer_ids = user_ids[0], user_ids[1:]
+    cur.execute("""
+        INSERT INTO posts (user_id, title, description, category, quantity, quantity_amount, quantity_unit,
+                           estimated_weight_kg, status, created_at)
+        VALUES (?, 'Stress test', 'Stress test', 'Meals', ?, ?, 'trays', 1, 'active', NOW())
+    """, (owner, f"{amount} trays", amount))
+    post_id = cur.lastrowid
+    claim_ids = []
+    for claimer in claimer_ids:
+        cur.execute("""
+            INSERT INTO claims (post_id, claimer_id, requested_quantity, requested_amount, status, created_at)
+            VALUES (?, ?, ?, ?, 'pending', NOW())
+        """, (post_id, claimer, f"{each} trays", each))
+        claim_ids.append(cur.lastrowid)
+    conn.commit()
+    cur.close()
+    return owner, user_ids, post_id, claim_ids
+
+
+def cleanup(conn, user_ids, post_id):
+    cur = conn.cursor()
+    placeholders = ",".join("?" * len(user_ids))
+    cur.execute(f"DELETE FROM user_events WHERE user_id IN ({placeholders})", tuple(user_ids))
+    cur.execute("DELETE FROM claims WHERE post_id=?", (post_id,))
+    cur.execute("DELETE FROM posts WHERE id=?", (post_id,))
+    cur.execute(f"DELETE FROM users WHERE id IN ({placeholders})", tuple(user_ids))
+    conn.commit()
+    cur.close()
+    reconcile(conn)
+
+
+def approve_all(owner, claim_ids, threads):
+    results = Counter()
+    errors = []
+    lock = threading.Lock()
+    pending = list(claim_ids)
+    start = threading.Barrier(threads)
+
+    def worker():
+        conn = connect()
+        cur = conn.cursor()
+        start.wait()
+        while True:
+            with lock:
+                if not pending:
+                    break
+                claim_id = pending.pop()
+            try:
+                decide_claim(cur, claim_id, owner, approve=True)
+                conn.commit()
+                outcome = "approved"
+            except ClaimDecisionError as e:
+                conn.rollback()
+                outcome = e.message.split(",")[0] if e.message.startswith("Only") else e.message
+            except mariadb.Error as e:
+                conn.rollback()
+                outcome = "database error"
+                with lock:
+                    errors.append(f"claim {claim_id}: {e}")
+            with lock:
+                results[outcome] += 1
+        cur.close()
+        conn.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    began = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return results, errors, time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--amount", type=Decimal, default=Decimal(20))
+    parser.add_argument("--claimers", type=int, default=50)
+    parser.add_argument("--each", type=Decimal, default=Decimal(1))
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    conn = connect()
+    owner, user_ids, post_id, claim_ids = setup(conn, args.amount, args.claimers, args.each)
+    try:
+        results, errors, elapsed = approve_all(owner, claim_ids, args.threads)
+
+        cur = conn.cursor()
+        cur.execute("SELECT status, quantity_amount, quantity FROM posts WHERE id=?", (post_id,))
+        status, remaining, quantity = cur.fetchone()
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(requested_amount), 0) FROM claims "
+                    "WHERE post_id=? AND status='approved'", (post_id,))
+        approved, allocated = cur.fetchone()
+        cur.close()
+        conn.commit()
+
+        print(f"{len(claim_ids)} approvals from {args.threads} connections in {elapsed * 1000:.0f} ms")
+        for outcome, n in results.most_common():
+            print(f"  {n:>5}  {outcome}")
+        for line in errors[:10]:
+            print("  ❌", line)
+        print(f"post: status={status} quantity_amount={remaining} quantity={quantity!r}")
+
+        expected_approved = min(len(claim_ids), int(args.amount // args.each))
+        problems = []
+        if allocated > args.amount:
+            problems.append(f"over-allocated: {allocated} approved of {args.amount}")
+        if remaining != args.amount - allocated:
+            problems.append(f"lost decrements: {args.amount} - {allocated} approved != {remaining} left")
+        if approved != results["approved"]:
+            problems.append(f"{results['approved']} approvals reported, {approved} recorded")
+        if approved != expected_approved:
+            problems.append(f"expected {expected_approved} approvals, got {approved}")
+        if (remaining == 0) != (status == "claimed"):
+            problems.append(f"post is {status!r} with {remaining} left")
+        for problem in problems:
+            print("❌", problem)
+        if not problems:
+            print("✅ no lost decrements, no over-allocation")
+        return 1 if problems or errors else 0
+    finally:
+        cleanup(conn, user_ids, post_id)
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import copy
+from decimal import Decimal
+
+import pytest
+
+import app.claim_decisions as claim_decisions
+from app.claim_decisions import APPROVE_SQL, ClaimDecisionError, decide_claim, decide_claims
+
+OWNER, CLAIMER = 1, 2
+
+
+class FakeCursor:
+    """
+    Runs the statements decide_claim issues against in-memory posts and
+    claims, evaluating them the way MariaDB does: conditional UPDATEs set
+    rowcount to the rows they matched, APPROVE_SQL assigns left to right,
+    and savepoints snapshot both tables.
+    """
+
+    def __init__(self, posts, claims):
+        self.posts = posts
+        self.claims = claims
+        self.rowcount = 0
+        self.statements = []
+        self._result = []
+        self._savepoint = None
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+        text = " ".join(sql.split())
+        if sql is APPROVE_SQL:
+            self._approve(*params)
+        elif text.startswith("SELECT c.id"):
+            self._result = [(claim_id, c["post_id"], self.posts[c["post_id"]]["user_id"], c["claimer_id"],
+                             c["requested_amount"], self.posts[c["post_id"]]["estimated_weight_kg"])
+                            for claim_id, c in self.claims.items() if claim_id in params]
+        elif text.startswith("UPDATE claims SET status=?"):
+            status, claim_id = params
+            claim = self.claims.get(claim_id)
+            self.rowcount = 0
+            if claim is not None and claim["status"] == "pending":
+                claim["status"] = status
+                self.rowcount = 1
+        elif text.startswith("SELECT status, quantity_amount, quantity_unit FROM posts"):
+            post = self.posts[params[0]]
+            self._result = [(post["status"], post["quantity_amount"], post["quantity_unit"])]
+        elif text == "SAVEPOINT claim_decision":
+            self._savepoint = copy.deepcopy((self.posts, self.claims))
+        elif text == "ROLLBACK TO SAVEPOINT claim_decision":
+            posts, claims = copy.deepcopy(self._savepoint)
+            self.posts.clear(); self.posts.update(posts)
+            self.claims.clear(); self.claims.update(claims)
+        else:
+            raise AssertionError(f"unexpected statement: {text}")
+
+    def _approve(self, amount, decrement, post_id, needed):
+        post = self.posts.get(post_id)
+        left = post["quantity_amount"] if post else None
+        if post is None or post["status"] != "active" or (left is not None and left < needed):
+            self.rowcount = 0
+            return
+        if left is None or left <= amount:
+            post["status"] = "claimed"
+        if left is not None:
+            post["quantity_amount"] = left - decrement
+        self.rowcount = 1
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture(autouse=True)
+def no_side_effects(monkeypatch):
+    """Counters and events are other modules' SQL; record the calls instead."""
+    calls = []
+    monkeypatch.setattr(claim_decisions, "emit", lambda cur, *args: calls.append(("emit", *args)))
+    monkeypatch.setattr(claim_decisions, "emit_to_claimers",
+                        lambda cur, *args: calls.append(("emit_to_claimers", *args)))
+    monkeypatch.setattr(claim_decisions, "post_status_changed",
+                        lambda cur, *args: calls.append(("post_status_changed", *args)))
+    return calls
+
+
+def make_cursor(amount="5", unit="kg", requests=("3",)):
+    posts = {10: {"user_id": OWNER, "status": "active", "estimated_weight_kg": 5.0,
+                  "quantity_amount": Decimal(amount) if amount is not None else None, "quantity_unit": unit}}
+    claims = {100 + i: {"post_id": 10, "claimer_id": CLAIMER + i, "status": "pending",
+                        "requested_amount": Decimal(r) if r is not None else None}
+              for i, r in enumerate(requests)}
+    return FakeCursor(posts, claims)
+
+
+def test_approve_takes_requested_amount():
+    cur = make_cursor(requests=("3",))
+    decision = decide_claim(cur, 100, OWNER, approve=True)
+    assert decision.status == "approved"
+    assert decision.post_status == "active"
+    assert decision.remaining == Decimal("2")
+    assert cur.claims[100]["status"] == "approved"
+
+
+def test_approve_of_last_amount_claims_post(no_side_effects):
+    cur = make_cursor(requests=("5",))
+    decision = decide_claim(cur, 100, OWNER, approve=True)
+    assert decision.post_status == "claimed"
+    assert decision.remaining == Decimal("0")
+    assert ("post_status_changed", "active", "claimed", 5.0) in no_side_effects
+
+
+def test_approve_more_than_left_is_refused():
+    cur = make_cursor(amount="2", requests=("3",))
+    with pytest.raises(ClaimDecisionError) as err:
+        decide_claim(cur, 100, OWNER, approve=True)
+    assert err.value.status == 409
+    assert err.value.details == {"remaining": Decimal("2"), "requested": Decimal("3")}
+    assert cur.posts[10]["quantity_amount"] == Decimal("2")
+    # The refusal re-reads the post with a locking read, not the snapshot.
+    assert cur.statements[-1].endswith("LOCK IN SHARE MODE")
+
+
+def test_approve_without_numeric_amount_takes_whole_post():
+    cur = make_cursor(amount=None, unit=None, requests=(None,))
+    decision = decide_claim(cur, 100, OWNER, approve=True)
+    assert decision.post_status == "claimed"
+    assert cur.posts[10]["status"] == "claimed"
+
+
+def test_approve_on_claimed_post_is_refused():
+    cur = make_cursor(requests=("1",))
+    cur.posts[10]["status"] = "claimed"
+    with pytest.raises(ClaimDecisionError) as err:
+        decide_claim(cur, 100, OWNER, approve=True)
+    assert err.value.status == 409
+    assert err.value.details == {"post_status": "claimed"}
+
+
+def test_reject_leaves_post_alone():
+    cur = make_cursor(requests=("3",))
+    decision = decide_claim(cur, 100, OWNER, approve=False)
+    assert decision.status == "rejected"
+    assert cur.posts[10]["quantity_amount"] == Decimal("5")
+    assert not any(sql is APPROVE_SQL for sql in cur.statements)
+
+
+@pytest.mark.parametrize("claim_id, user_id, status", [
+    (999, OWNER, 404),
+    (100, CLAIMER, 403),
+])
+def test_decide_checks_claim_and_owner(claim_id, user_id, status):
+    cur = make_cursor()
+    with pytest.raises(ClaimDecisionError) as err:
+        decide_claim(cur, claim_id, user_id, approve=True)
+    assert err.value.status == status
+
+
+def test_decided_claim_cannot_be_decided_again():
+    cur = make_cursor(requests=("1",))
+    decide_claim(cur, 100, OWNER, approve=True)
+    with pytest.raises(ClaimDecisionError) as err:
+        decide_claim(cur, 100, OWNER, approve=False)
+    assert err.value.status == 409
+    assert cur.posts[10]["quantity_amount"] == Decimal("4")
+
+
+def test_batch_rolls_back_only_the_failed_claim():
+    cur = make_cursor(requests=("3", "3", "1"))
+    results = dict(decide_claims(cur, OWNER, [(100, True), (101, True), (102, False)]))
+    assert results[100].status == "approved"
+    assert isinstance(results[101], ClaimDecisionError) and results[101].status == 409
+    assert results[102].status == "rejected"
+    # Claim 101 was marked approved before the post refused it; the savepoint undid that.
+    assert cur.claims[101]["status"] == "pending"
+    assert cur.posts[10]["quantity_amount"] == Decimal("2")
+
+
+def test_batch_reports_duplicates_and_unknown_claims():
+    cur = make_cursor(requests=("1",))
+    results = decide_claims(cur, OWNER, [(100, True), (100, False), (555, True)])
+    assert [claim_id for claim_id, _ in results] == [100, 100, 555]
+    assert results[0][1].status == "approved"
+    assert results[1][1].status == 400
+    assert results[2][1].status == 404
+    assert sum(1 for sql in cur.statements if " ".join(sql.split()).startswith("SELECT c.id")) == 1
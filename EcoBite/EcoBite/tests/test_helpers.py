@@ -0,0 +1,142 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import app.db as db
+from app.db import CircuitBreaker
+from app.dietary import parse_tags
+from app.limits import TokenBuckets
+from app.pagination import decode_cursor, encode_cursor
+from app.quantities import parse_quantity
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, []),
+    ("", []),
+    ("vegan, Halal ,vegan", ["vegan", "Halal"]),
+    ('["vegan", "gluten-free"]', ["vegan", "gluten-free"]),
+    ('"vegan"', ["vegan"]),
+    (["Vegan", "vegan", None, " "], ["Vegan"]),
+    ("1", ["1"]),
+    ("null", ["null"]),
+    ("true", ["true"]),
+    (7, ["7"]),
+    ("x" * 100, ["x" * 64]),
+])
+def test_parse_tags(value, expected):
+    assert parse_tags(value) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("5", (Decimal("5.00"), None)),
+    ("2.5 kg", (Decimal("2.50"), "kg")),
+    ("2,5 kg", (Decimal("2.50"), "kg")),
+    ("  3 trays ", (Decimal("3.00"), "trays")),
+    ("some bread", (None, None)),
+    ("", (None, None)),
+    (None, (None, None)),
+    ("1000000000 kg", (None, None)),
+])
+def test_parse_quantity(text, expected):
+    assert parse_quantity(text) == expected
+
+
+@pytest.mark.parametrize("sort, row, key", [
+    ("newest", {"id": 7, "created_at": datetime(2026, 5, 1, 12, 30)}, datetime(2026, 5, 1, 12, 30)),
+    ("endingSoon", {"id": 8, "expires_at": None}, None),
+    ("relevance", {"id": 9, "relevance": 1.25}, 1.25),
+])
+def test_cursor_round_trip(sort, row, key):
+    assert decode_cursor(encode_cursor(sort, row), sort) == (key, row["id"])
+
+
+def test_cursor_rejects_other_sort_and_garbage():
+    token = encode_cursor("newest", {"id": 1, "created_at": datetime(2026, 1, 1)})
+    with pytest.raises(ValueError, match="sort order"):
+        decode_cursor(token, "endingSoon")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("not-a-cursor", "newest")
+
+
+def test_token_bucket_spends_burst_then_refills():
+    buckets = TokenBuckets()
+    assert [buckets.take(("ip", "a"), rate=1, burst=2, now=0) for _ in range(2)] == [0, 0]
+    assert buckets.take(("ip", "a"), rate=1, burst=2, now=0) == pytest.approx(1)
+    assert buckets.take(("ip", "a"), rate=1, burst=2, now=0.5) == pytest.approx(0.5)
+    assert buckets.take(("ip", "a"), rate=1, burst=2, now=1.5) == 0
+    assert buckets.rejected == 2
+
+
+def test_token_buckets_are_all_or_nothing():
+    buckets = TokenBuckets()
+    ip, user = ("ip", "a"), ("user", 1)
+    assert buckets.take(user, rate=1, burst=1, now=0) == 0
+    # The user bucket is empty, so the IP bucket must not be charged either.
+    assert buckets.take([ip, user], rate=1, burst=1, now=0) > 0
+    assert buckets.take(ip, rate=1, burst=1, now=0) == 0
+
+
+def test_token_buckets_drop_least_recently_used():
+    buckets = TokenBuckets(max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        buckets.take((key,), rate=1, burst=1, now=0)
+    assert len(buckets) == 2
+    assert buckets.take(("b",), rate=1, burst=1, now=0) == 0     # forgotten, so full again
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=1)
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_lets_one_probe_through_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1)
+    breaker.failure()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()          # only one probe at a time
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_breaker_backs_off_when_probe_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1, max_reset_timeout=3)
+    breaker.failure()
+    for open_for in (2, 3, 3):
+        clock.now += 10
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.state == "open" and breaker.stats()["open_for"] == open_for
+    clock.now += 2.9
+    assert not breaker.allow()
+
+
+def test_breaker_abandoned_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1)
+    breaker.failure()
+    clock.now += 1
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.allow()